@@ -0,0 +1,28 @@
+class BookingError(Exception):
+    '''
+    Base class for booking failures that should be reported to the user.
+    '''
+    message = 'This slot cannot be booked'
+
+    def __init__(self, message=None):
+        super().__init__(message or self.message)
+
+
+class SlotFullError(BookingError):
+    message = 'This Class has already been filled'
+
+
+class AlreadyBookedError(BookingError):
+    message = 'You have already booked this slot'
+
+
+class NotBookedError(BookingError):
+    message = 'You have not booked this slot'
+
+
+class AlreadyWaitlistedError(BookingError):
+    message = 'You are already on the waitlist of this slot'
+
+
+class NotWaitlistedError(BookingError):
+    message = 'You are not on the waitlist of this slot'
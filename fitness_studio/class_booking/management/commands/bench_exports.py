@@ -0,0 +1,69 @@
+import json
+import time as timer
+import tracemalloc
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from class_booking.models import ClassBooking
+from class_booking.serializers import booking_representation
+from core.benchmark import benchmark_database
+from core.seed import create_bookings, create_instructor, create_members, create_slots
+from core.streaming import export_response
+from fitness_class.models import FitnessClass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare peak memory and time to first byte of a buffered bookings listing with '
+        'the streaming export as the number of bookings grows. Runs against a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', default='1000,10000,20000',
+            help='Comma separated booking counts to measure at (default: 1000,10000,20000).'
+        )
+
+    def handle(self, *args, **options):
+        levels = sorted(int(level) for level in options['rows'].split(','))
+        with benchmark_database():
+            instructor = create_instructor()
+            for level in levels:
+                self.grow(instructor, level)
+                bookings = ClassBooking.objects.with_details().order_by('id')
+
+                def buffered():
+                    data = [booking_representation(booking) for booking in bookings]
+                    return [JSONRenderer().render({"status": "Success", "data": data})]
+
+                def streamed():
+                    return export_response(bookings, booking_representation, 'json', 'bookings').streaming_content
+
+                for label, build in (('buffered', buffered), ('streamed', streamed)):
+                    tracemalloc.start()
+                    start = timer.perf_counter()
+                    chunks = iter(build())
+                    next(chunks)
+                    first_byte = (timer.perf_counter() - start) * 1000
+                    for _chunk in chunks:
+                        pass
+                    total = (timer.perf_counter() - start) * 1000
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    self.stdout.write(
+                        f'{level:>7} bookings  {label:<9} peak {peak / 2**20:>7.1f} MiB   '
+                        f'first byte {first_byte:>8.1f} ms   total {total:>8.1f} ms'
+                    )
+
+    def grow(self, instructor, level):
+        # One class of ten slots per thousand bookings, 100 members per slot.
+        missing = level - ClassBooking.objects.count()
+        if missing <= 0:
+            return
+        if not hasattr(self, 'member_ids'):
+            self.member_ids = create_members(100)
+        first = FitnessClass.objects.count()
+        dates = [date(2030, 1, 1) + timedelta(days=first + i) for i in range(-(-missing // 1000))]
+        create_bookings(create_slots(instructor, dates, per_class=10), self.member_ids, missing)
@@ -0,0 +1,44 @@
+import time as timer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from class_booking.reminders import send_reminders
+
+
+class Command(BaseCommand):
+    help = (
+        'Remind members of the classes they booked, REMINDER_MINUTES_BEFORE minutes before '
+        'the start, through NOTIFICATION_BACKEND. Run it every few minutes, or with --interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minutes', type=int, default=settings.REMINDER_MINUTES_BEFORE,
+                            help='Remind of slots starting within this many minutes.')
+        parser.add_argument('--batch-size', type=int, default=200, help='Slots per batch.')
+        parser.add_argument('--interval', type=float, help='Keep running, scanning every this many seconds.')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                close_old_connections()
+                self.scan(options['minutes'], options['batch_size'])
+                if not options['interval']:
+                    break
+                timer.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def scan(self, minutes, batch_size):
+        slots = reminders = 0
+        total_ms = 0.0
+        for batch, (batch_slots, sent, elapsed) in enumerate(send_reminders(minutes, batch_size), 1):
+            slots += batch_slots
+            reminders += sent
+            total_ms += elapsed
+            self.stdout.write(
+                f'batch {batch:<4} {batch_slots} slot(s)  {sent} reminder(s)  {elapsed:.1f} ms  '
+                f'{sent / elapsed * 1000 if elapsed else 0:.0f} reminders/s'
+            )
+        self.stdout.write(f'{reminders} reminder(s) for {slots} slot(s) in {total_ms:.1f} ms')
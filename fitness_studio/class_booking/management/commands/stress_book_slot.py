@@ -0,0 +1,93 @@
+import threading
+import time as timer
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from class_booking.exceptions import AlreadyBookedError, SlotFullError
+from class_booking.models import ClassBooking
+from core.benchmark import benchmark_database
+from core.seed import create_instructor, create_members, create_slots
+from core.timezones import studio_today
+from fitness_class.models import ClassSlot
+from user.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire many parallel bookings at one (or a few) slots and report the booking '
+        'throughput of the configured database backend. Runs against a throwaway test database. '
+        'Booking correctness is covered by the class_booking tests.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=300, help='Number of parallel booking attempts.')
+        parser.add_argument('--capacity', type=int, default=50, help='member_max_count of the slot.')
+        parser.add_argument('--threads', type=int, default=32, help='Worker threads.')
+        parser.add_argument('--slots', type=int, default=1, help='Slots the attempts are spread over.')
+        parser.add_argument(
+            '--duplicates', type=int, default=20,
+            help='Attempts made by members who already fired an attempt (double bookings).'
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database(on_disk=True):
+            vendor = connection.vendor
+            attempts = self.seed(options['slots'], options['capacity'], options['attempts'], options['duplicates'])
+            results, elapsed = self.run(attempts, options['threads'])
+
+            slots = list(ClassSlot.objects.order_by('id'))
+
+        self.stdout.write(f'database   {vendor}, {options["threads"]} threads, {len(slots)} slot(s)')
+        for outcome in ('booked', 'full', 'duplicate', 'error'):
+            self.stdout.write(f'{outcome:<10} {results[outcome]}')
+        self.stdout.write(f'elapsed    {elapsed:.2f} s ({len(attempts) / elapsed:.0f} attempts/s, '
+                          f'{results["booked"] / elapsed:.0f} bookings/s)')
+
+        for slot in slots:
+            self.stdout.write(f'slot {slot.id:<5} booked_count={slot.booked_count}, capacity={options["capacity"]}')
+
+    def seed(self, slot_count, capacity, attempts, duplicates):
+        slots = create_slots(
+            create_instructor(), [studio_today() + timedelta(days=1)], per_class=slot_count,
+            class_types=('hiit',), member_max_count=capacity, minutes=45,
+        )
+        # (slot_id, user_id) pairs, members spread round robin over the slots.
+        pairs = [(slots[i % slot_count].id, user_id) for i, user_id in enumerate(create_members(attempts))]
+        return pairs + pairs[:duplicates]
+
+    def run(self, attempts, threads):
+        results = {'booked': 0, 'full': 0, 'duplicate': 0, 'error': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(min(threads, len(attempts)))
+
+        def attempt(slot_id, user_id):
+            try:
+                slot = ClassSlot.objects.select_related('fitness_class').get(id=slot_id)
+                ClassBooking.objects.book(slot, CustomUser(id=user_id))
+                outcome = 'booked'
+            except SlotFullError:
+                outcome = 'full'
+            except AlreadyBookedError:
+                outcome = 'duplicate'
+            except Exception as e:
+                self.stderr.write(str(e))
+                outcome = 'error'
+            with lock:
+                results[outcome] += 1
+
+        def worker(chunk):
+            try:
+                barrier.wait()
+                for slot_id, user_id in chunk:
+                    attempt(slot_id, user_id)
+            finally:
+                connection.close()
+
+        chunks = [attempts[i::threads] for i in range(threads) if attempts[i::threads]]
+        start = timer.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            list(executor.map(worker, chunks))
+        return results, timer.perf_counter() - start
@@ -0,0 +1,116 @@
+import random
+import threading
+import time as timer
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from class_booking.exceptions import BookingError
+from class_booking.models import ClassBooking, WaitlistEntry
+from core.benchmark import benchmark_database
+from core.seed import create_bookings, create_instructor, create_members, create_slots
+from core.timezones import studio_today
+from fitness_class.models import ClassSlot
+from user.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Race cancellations of a full slot against waitlist joins and direct bookings '
+        'and report the throughput and the final counts. The promotion rules are '
+        'checked by the class_booking tests. Runs against a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--capacity', type=int, default=50, help='member_max_count of the slot.')
+        parser.add_argument('--cancellations', type=int, default=40, help='Booked members who cancel.')
+        parser.add_argument('--waiters', type=int, default=60, help='Members who join the waitlist.')
+        parser.add_argument('--bookers', type=int, default=40, help='Members who try to book directly.')
+        parser.add_argument('--threads', type=int, default=16, help='Worker threads.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the operation order.')
+
+    def handle(self, *args, **options):
+        if options['cancellations'] > options['capacity']:
+            raise CommandError('--cancellations cannot exceed --capacity.')
+        with benchmark_database(on_disk=True):
+            vendor = connection.vendor
+            slot_id, operations = self.seed(options)
+            results, elapsed = self.run(slot_id, operations, options['threads'])
+
+            slot = ClassSlot.objects.select_related('fitness_class').get(id=slot_id)
+            bookings = ClassBooking.objects.filter(class_slot_id=slot_id).count()
+            waiting = WaitlistEntry.objects.filter(class_slot_id=slot_id).count()
+
+        self.stdout.write(f'database   {vendor}, {options["threads"]} threads')
+        for outcome, count in results.items():
+            self.stdout.write(f'{outcome:<10} {count}')
+        self.stdout.write(f'elapsed    {elapsed:.2f} s ({len(operations) / elapsed:.0f} operations/s)')
+        self.stdout.write(
+            f'slot       {bookings} bookings (booked_count={slot.booked_count}, '
+            f'capacity={options["capacity"]}), {waiting} waiting'
+        )
+
+        if results['error']:
+            raise CommandError('Operations failed unexpectedly.')
+
+    def seed(self, options):
+        capacity = options['capacity']
+        slot, = create_slots(
+            create_instructor(), [studio_today() + timedelta(days=1)], class_types=('hiit',),
+            member_max_count=capacity, minutes=45,
+        )
+        user_ids = create_members(capacity + options['waiters'] + options['bookers'])
+        holders = user_ids[:capacity]
+        create_bookings([slot], holders, capacity)
+
+        waiters = user_ids[capacity:capacity + options['waiters']]
+        bookers = user_ids[capacity + options['waiters']:]
+        operations = (
+            [('cancel', user_id) for user_id in holders[:options['cancellations']]]
+            + [('join', user_id) for user_id in waiters]
+            + [('book', user_id) for user_id in bookers]
+        )
+        random.Random(options['seed']).shuffle(operations)
+        return slot.id, operations
+
+    def run(self, slot_id, operations, threads):
+        results = {'cancelled': 0, 'waiting': 0, 'booked': 0, 'rejected': 0, 'error': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(min(threads, len(operations)))
+
+        def operate(kind, user_id):
+            try:
+                slot = ClassSlot.objects.select_related('fitness_class').get(id=slot_id)
+                user = CustomUser(id=user_id)
+                if kind == 'cancel':
+                    ClassBooking.objects.cancel(slot, user)
+                    outcome = 'cancelled'
+                elif kind == 'join':
+                    booking, _ = WaitlistEntry.objects.join(slot, user)
+                    outcome = 'booked' if booking else 'waiting'
+                else:
+                    ClassBooking.objects.book(slot, user)
+                    outcome = 'booked'
+            except BookingError:
+                outcome = 'rejected'
+            except Exception as e:
+                self.stderr.write(str(e))
+                outcome = 'error'
+            with lock:
+                results[outcome] += 1
+
+        def worker(chunk):
+            try:
+                barrier.wait()
+                for kind, user_id in chunk:
+                    operate(kind, user_id)
+            finally:
+                connection.close()
+
+        chunks = [operations[i::threads] for i in range(threads) if operations[i::threads]]
+        start = timer.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            list(executor.map(worker, chunks))
+        return results, timer.perf_counter() - start
@@ -0,0 +1,143 @@
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+
+from core.tasks import enqueue
+from fitness_class.cache import invalidate_available_classes
+from fitness_class.models import ClassSlot
+from fitness_class.occupancy import update_occupancy
+from .exceptions import AlreadyBookedError, AlreadyWaitlistedError, NotBookedError, NotWaitlistedError, SlotFullError
+
+
+class ClassBookingQuerySet(models.QuerySet):
+
+    def with_details(self):
+        '''
+        Join everything a booking listing renders: the booking user, the slot,
+        its class and the class instructor. Use this for every booking
+        listing so serializing rows never triggers per-row queries.
+        '''
+        return self.select_related('user', 'class_slot__fitness_class__instructor')
+
+
+class ClassBookingManager(models.Manager.from_queryset(ClassBookingQuerySet)):
+
+    def book(self, slot, user):
+        '''
+        Reserve a seat in the slot and create the booking in one transaction.
+
+        Capacity is enforced by a single conditional UPDATE on the slot row,
+        so concurrent requests can never push booked_count past
+        member_max_count. The unique (class_slot, user) constraint rejects
+        double bookings, which rolls the seat reservation back as well.
+        The confirmation is queued in the same transaction (see
+        core.tasks). The occupancy rollup is not touched: its booked
+        figures are read from booked_count.
+
+        Raises SlotFullError or AlreadyBookedError.
+        '''
+        try:
+            with transaction.atomic():
+                reserved = ClassSlot.objects.filter(
+                    id=slot.id,
+                    booked_count__lt=slot.fitness_class.member_max_count,
+                ).update(booked_count=F('booked_count') + 1)
+                if not reserved:
+                    raise SlotFullError()
+                booking = self.create(class_slot=slot, user_id=user.id)
+                # A member who got a seat directly no longer waits for one.
+                slot.waitlist_entries.filter(user_id=user.id).delete()
+                # Outbox: the confirmation is sent by the task worker.
+                enqueue('booking.confirmation', {'booking_id': booking.id, 'reason': 'booked'})
+                invalidate_available_classes()
+                return booking
+        except IntegrityError:
+            # Only the unique (class_slot, user) constraint means a double
+            # booking; any other integrity error is a bug and propagates.
+            if self.filter(class_slot_id=slot.id, user_id=user.id).exists():
+                raise AlreadyBookedError()
+            raise
+
+    def cancel(self, slot, user):
+        '''
+        Cancel the user's booking of the slot in one transaction. The seat
+        goes to the head of the slot's waitlist if anyone is waiting,
+        otherwise it is released.
+
+        The slot row is locked first, so cancellations and waitlist joins
+        of a slot are serialized and a freed seat is never left empty
+        while someone waits for it. A promoted seat never becomes free, so
+        concurrent book() calls cannot take it from the waitlist.
+
+        Returns the booking of the promoted member, or None. Raises
+        NotBookedError.
+        '''
+        from .models import WaitlistEntry
+
+        with transaction.atomic():
+            lock_slot(slot.id)
+            deleted, _ = self.filter(class_slot_id=slot.id, user_id=user.id).delete()
+            if not deleted:
+                raise NotBookedError()
+            head = WaitlistEntry.objects.filter(class_slot_id=slot.id).order_by('id').first()
+            if head is None:
+                ClassSlot.objects.filter(id=slot.id, booked_count__gt=0).update(
+                    booked_count=F('booked_count') - 1
+                )
+                promoted = None
+            else:
+                head.delete()
+                promoted = self.create(class_slot_id=slot.id, user_id=head.user_id)
+                enqueue('booking.confirmation', {'booking_id': promoted.id, 'reason': 'promoted'})
+            record_occupancy(slot, cancellations=1)
+            invalidate_available_classes()
+            return promoted
+
+
+class WaitlistEntryManager(models.Manager):
+
+    def join(self, slot, user):
+        '''
+        Book a seat in the slot if one is free, otherwise put the user at
+        the end of its waitlist.
+
+        Returns (booking, None) or (None, waitlist entry). Raises
+        AlreadyBookedError or AlreadyWaitlistedError.
+        '''
+        from .models import ClassBooking
+
+        with transaction.atomic():
+            lock_slot(slot.id)
+            try:
+                return ClassBooking.objects.book(slot, user), None
+            except SlotFullError:
+                pass
+            if ClassBooking.objects.filter(class_slot_id=slot.id, user_id=user.id).exists():
+                raise AlreadyBookedError()
+            try:
+                with transaction.atomic():
+                    return None, self.create(class_slot=slot, user_id=user.id)
+            except IntegrityError:
+                raise AlreadyWaitlistedError()
+
+    def leave(self, slot, user):
+        '''
+        Take the user off the slot's waitlist. Raises NotWaitlistedError.
+        '''
+        deleted, _ = self.filter(class_slot_id=slot.id, user_id=user.id).delete()
+        if not deleted:
+            raise NotWaitlistedError()
+
+    def position(self, entry):
+        # 1 for the head of the waitlist.
+        return self.filter(class_slot_id=entry.class_slot_id, id__lte=entry.id).count()
+
+
+def record_occupancy(slot, **deltas):
+    fitness_class = slot.fitness_class
+    update_occupancy(fitness_class.instructor_id, fitness_class.class_type, fitness_class.date, **deltas)
+
+
+def lock_slot(slot_id):
+    # Row lock on databases that support it; SQLite already serializes
+    # write transactions (transaction_mode IMMEDIATE in settings).
+    list(ClassSlot.objects.select_for_update().filter(id=slot_id).values_list('id', flat=True))
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.2 on 2026-10-18 07:54
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+
+
+def remove_duplicate_bookings(apps, schema_editor):
+    '''
+    Keep the earliest booking of every (class_slot, user) pair so the unique
+    constraint can be added, and give the freed seats back to the slot.
+    '''
+    ClassBooking = apps.get_model('class_booking', 'ClassBooking')
+    ClassSlot = apps.get_model('fitness_class', 'ClassSlot')
+    duplicates = ClassBooking.objects.values('class_slot', 'user').annotate(
+        first_id=Min('id'), total=Count('id'),
+    ).filter(total__gt=1)
+    for duplicate in duplicates:
+        ClassBooking.objects.filter(
+            class_slot=duplicate['class_slot'], user=duplicate['user'],
+        ).exclude(id=duplicate['first_id']).delete()
+        ClassSlot.objects.filter(id=duplicate['class_slot']).update(
+            booked_count=F('booked_count') - (duplicate['total'] - 1)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('class_booking', '0001_initial'),
+        ('fitness_class', '0003_class_slot_booked_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='classbooking',
+            constraint=models.UniqueConstraint(fields=('class_slot', 'user'), name='unique_class_slot_user'),
+        ),
+    ]
@@ -2,11 +2,42 @@ from django.db import models
 
 from fitness_class.models import ClassSlot
 from user.models import CustomUser
+from .managers import ClassBookingManager, WaitlistEntryManager
 
 # Create your models here.
 class ClassBooking(models.Model):
     class_slot = models.ForeignKey(ClassSlot, on_delete=models.CASCADE, related_name='class_slot')
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='user')
 
+    objects = ClassBookingManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['class_slot', 'user'], name='unique_class_slot_user'),
+        ]
+
+    def __str__(self):
+        return self.user.name
+
+class WaitlistEntry(models.Model):
+    '''
+    A member waiting for a seat in a full slot. Entries are served first in,
+    first out (by id) when a booking of the slot is cancelled.
+    '''
+    class_slot = models.ForeignKey(ClassSlot, on_delete=models.CASCADE, related_name='waitlist_entries')
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='waitlist_entries')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = WaitlistEntryManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['class_slot', 'user'], name='unique_waitlist_slot_user'),
+        ]
+        indexes = [
+            # Head of a slot's waitlist and a member's position in it.
+            models.Index(fields=['class_slot', 'id'], name='waitlist_slot_order_idx'),
+        ]
+
     def __str__(self):
-        return self.user.name
\ No newline at end of file
+        return self.user.name
@@ -0,0 +1,63 @@
+import logging
+import time as timer
+from datetime import timedelta
+
+from django.utils import timezone
+
+from core.notifications import Notification, send_notifications
+from fitness_class.models import ClassSlot
+from .models import ClassBooking
+
+logger = logging.getLogger(__name__)
+
+
+def due_slots(now, minutes_before):
+    '''
+    Slots starting within the next minutes_before minutes whose members
+    have not been reminded yet, in start order.
+    '''
+    return ClassSlot.objects.upcoming(now).starting_by(
+        now + timedelta(minutes=minutes_before)
+    ).filter(
+        reminded_at__isnull=True,
+    ).select_related('fitness_class').order_by('start_at', 'id')
+
+
+def send_reminders(minutes_before, batch_size=200, now=None):
+    '''
+    Remind the members of every slot starting within minutes_before minutes.
+
+    Due slots are walked in start order, batch_size slots at a time, with
+    keyset pagination over the start_at index. Each batch
+    costs three queries: the slots, their bookings and one UPDATE that
+    marks the slots as reminded once the batch is sent. A crash between
+    sending and marking sends that batch again on the next run.
+
+    Yields per-batch metrics: slots, reminders and milliseconds.
+    '''
+    if now is None:
+        now = timezone.now()
+    slots = due_slots(now, minutes_before)
+    cursor = None
+    while True:
+        start = timer.perf_counter()
+        page = slots.after(*cursor) if cursor else slots
+        batch = list(page[:batch_size])
+        if not batch:
+            return
+        by_slot = {slot.id: slot for slot in batch}
+        bookings = ClassBooking.objects.filter(class_slot_id__in=by_slot).select_related('user').order_by('id')
+        notifications = []
+        for booking in bookings:
+            slot = by_slot[booking.class_slot_id]
+            notifications.append(Notification(
+                booking.user.email, 'Class reminder',
+                f'{slot.fitness_class.name} starts at {slot.start_time:%H:%M} on {slot.fitness_class.date}',
+            ))
+        sent = send_notifications(notifications)
+        ClassSlot.objects.filter(id__in=by_slot).update(reminded_at=timezone.now())
+        elapsed = (timer.perf_counter() - start) * 1000
+        logger.info('reminder batch slots=%d reminders=%d ms=%.1f', len(batch), sent, elapsed)
+        yield len(batch), sent, elapsed
+        last = batch[-1]
+        cursor = (last.start_at, last.id)
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 
 from .models import ClassBooking
-from fitness_class.serializers import ClassSlotSerializer
+from fitness_class.serializers import ClassSlotSerializer, slot_representation, user_representation
 from user.serializers import CustomUserSerializer
 
     
@@ -29,4 +29,17 @@ class ClassBookingSerializer(serializers.ModelSerializer):
             allowed = set(required_fields)
             existing = set(self.fields)
             for field_name in existing - allowed:
-                self.fields.pop(field_name)
\ No newline at end of file
+                self.fields.pop(field_name)
+
+def booking_representation(booking, target_timezone=None):
+    '''
+    Read-only fast path of ClassBookingSerializer for listings.
+
+    Produces the same JSON as ClassBookingSerializer(booking).data.
+    target_timezone must already be resolved with get_timezone.
+    '''
+    return {
+        'id': booking.id,
+        'user': user_representation(booking.user),
+        'class_slot': slot_representation(booking.class_slot, target_timezone),
+    }
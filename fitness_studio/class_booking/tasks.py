@@ -0,0 +1,22 @@
+from core.notifications import Notification, send_notifications
+from core.tasks import task
+from .models import ClassBooking
+
+
+@task('booking.confirmation', batch=True)
+def send_booking_confirmations(payloads):
+    '''
+    Confirm new bookings, including seats given to waitlisted members, to
+    the booking members. Payloads are {"booking_id", "reason"} with reason
+    "booked" or "promoted"; bookings cancelled in the meantime are skipped.
+    '''
+    reasons = {payload['booking_id']: payload.get('reason', 'booked') for payload in payloads}
+    notifications = []
+    for booking in ClassBooking.objects.with_details().filter(id__in=reasons):
+        slot = booking.class_slot
+        subject = 'You got a seat from the waitlist' if reasons[booking.id] == 'promoted' else 'Booking confirmed'
+        notifications.append(Notification(
+            booking.user.email, subject,
+            f'{slot.fitness_class.name} on {slot.fitness_class.date} at {slot.start_time:%H:%M}',
+        ))
+    send_notifications(notifications)
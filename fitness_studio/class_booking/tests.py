@@ -1,3 +1,333 @@
-from django.test import TestCase
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.seed import create_bookings, create_instructor, create_members, create_slots
+from core.streaming import EXPORT_FORMATS, export_response
+from core.timezones import studio_datetime, studio_today
+from fitness_class.cache import available_classes_cache
+from fitness_class.models import ClassSlot
+from fitness_class.views import get_available_classes
+from user.models import CustomUser
+from .exceptions import AlreadyBookedError, SlotFullError
+from .models import ClassBooking, WaitlistEntry
+from .reminders import send_reminders
+from .serializers import booking_representation
+from .views import export_bookings, get_booking_details
+
+
+def create_slot(capacity):
+    slot, = create_slots(
+        create_instructor(), [studio_today() + timedelta(days=1)], member_max_count=capacity,
+    )
+    return ClassSlot.objects.select_related('fitness_class').get(id=slot.id)
+
+
+class BookSlotTests(TransactionTestCase):
+
+    def test_full_slot_raises_slot_full(self):
+        slot = create_slot(capacity=1)
+        first, second = create_members(2)
+        ClassBooking.objects.book(slot, CustomUser(id=first))
+        with self.assertRaises(SlotFullError):
+            ClassBooking.objects.book(slot, CustomUser(id=second))
+        slot.refresh_from_db()
+        self.assertEqual(slot.booked_count, 1)
+
+    def test_double_booking_raises_already_booked(self):
+        slot = create_slot(capacity=5)
+        member, = create_members(1)
+        ClassBooking.objects.book(slot, CustomUser(id=member))
+        with self.assertRaises(AlreadyBookedError):
+            ClassBooking.objects.book(slot, CustomUser(id=member))
+        slot.refresh_from_db()
+        # The second attempt's seat reservation was rolled back.
+        self.assertEqual(slot.booked_count, 1)
+
+    def test_other_integrity_errors_propagate(self):
+        slot = create_slot(capacity=5)
+        with self.assertRaises(IntegrityError) as raised:
+            ClassBooking.objects.book(slot, CustomUser(id=999_999))
+        self.assertNotIsInstance(raised.exception, AlreadyBookedError)
+        slot.refresh_from_db()
+        self.assertEqual(slot.booked_count, 0)
+
+    def race(self, slot, attempts, threads=16):
+        # Runs the booking attempts spread over the threads and returns
+        # the outcome of each.
+        outcomes = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads)
+
+        def worker(chunk):
+            try:
+                barrier.wait()
+                for user_id in chunk:
+                    try:
+                        ClassBooking.objects.book(slot, CustomUser(id=user_id))
+                        outcome = 'booked'
+                    except (SlotFullError, AlreadyBookedError) as e:
+                        outcome = type(e).__name__
+                    with lock:
+                        outcomes.append(outcome)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(worker, [attempts[i::threads] for i in range(threads)]))
+        self.assertEqual(len(outcomes), len(attempts))
+        return outcomes
+
+    def assert_booked(self, slot, count):
+        slot.refresh_from_db()
+        bookings = ClassBooking.objects.filter(class_slot=slot)
+        self.assertEqual(slot.booked_count, count)
+        self.assertEqual(bookings.count(), count)
+        self.assertEqual(bookings.values('user').distinct().count(), count)
+
+    def test_concurrent_bookings_keep_booked_count_exact(self):
+        capacity = 50
+        slot = create_slot(capacity)
+        members = create_members(300)
+        outcomes = self.race(slot, members)
+        self.assertEqual(outcomes.count('booked'), capacity)
+        self.assertEqual(outcomes.count('SlotFullError'), len(members) - capacity)
+        self.assert_booked(slot, capacity)
+
+    def test_concurrent_double_bookings_are_rejected(self):
+        members = create_members(300)
+        # Seats stay free throughout: a duplicate holds a seat only until
+        # its INSERT fails, at most one per thread at a time.
+        slot = create_slot(capacity=len(members) + 16)
+        # Both attempts of a member are adjacent, so they run on two
+        # threads at about the same time.
+        outcomes = self.race(slot, [user_id for user_id in members for _ in range(2)])
+        self.assertEqual(outcomes.count('booked'), len(members))
+        self.assertEqual(outcomes.count('AlreadyBookedError'), len(members))
+        self.assertEqual(outcomes.count('SlotFullError'), 0)
+        self.assert_booked(slot, len(members))
+
+
+class WaitlistTests(TestCase):
+
+    def setUp(self):
+        self.slot = create_slot(capacity=2)
+        self.holders = create_members(2)
+        create_bookings([self.slot], self.holders, 2)
+        self.waiters = create_members(3)
+        for user_id in self.waiters:
+            booking, entry = WaitlistEntry.objects.join(self.slot, CustomUser(id=user_id))
+            self.assertIsNone(booking)
+
+    def booked(self):
+        return set(ClassBooking.objects.filter(class_slot=self.slot).values_list('user_id', flat=True))
+
+    def waiting(self):
+        return list(WaitlistEntry.objects.filter(class_slot=self.slot).order_by('id').values_list('user_id', flat=True))
+
+    def test_cancel_promotes_the_head_of_the_waitlist(self):
+        promoted = ClassBooking.objects.cancel(self.slot, CustomUser(id=self.holders[0]))
+        self.assertEqual(promoted.user_id, self.waiters[0])
+        self.assertEqual(self.booked(), {self.holders[1], self.waiters[0]})
+        self.assertEqual(self.waiting(), self.waiters[1:])
+
+    def test_waitlist_is_served_first_in_first_out(self):
+        promoted = [
+            ClassBooking.objects.cancel(self.slot, CustomUser(id=user_id)).user_id
+            for user_id in self.holders
+        ]
+        self.assertEqual(promoted, self.waiters[:2])
+        self.assertEqual(self.waiting(), self.waiters[2:])
+
+    def test_promotion_keeps_booked_count(self):
+        ClassBooking.objects.cancel(self.slot, CustomUser(id=self.holders[0]))
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked_count, 2)
+        self.assertEqual(ClassBooking.objects.filter(class_slot=self.slot).count(), 2)
+
+    def test_cancel_without_waiters_frees_the_seat(self):
+        WaitlistEntry.objects.filter(class_slot=self.slot).delete()
+        self.assertIsNone(ClassBooking.objects.cancel(self.slot, CustomUser(id=self.holders[0])))
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked_count, 1)
+
+
+class WaitlistRaceTests(TransactionTestCase):
+
+    def test_concurrent_cancellations_and_joins_promote_in_order(self):
+        capacity = 10
+        slot = create_slot(capacity)
+        holders = create_members(capacity)
+        create_bookings([slot], holders, capacity)
+        waiters = create_members(15)
+        operations = [('cancel', user_id) for user_id in holders[:8]] + [('join', user_id) for user_id in waiters]
+        # Interleave cancellations and joins across the threads.
+        operations = operations[::2] + operations[1::2]
+        joined = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(6)
+
+        def worker(chunk):
+            try:
+                barrier.wait()
+                for kind, user_id in chunk:
+                    if kind == 'cancel':
+                        ClassBooking.objects.cancel(slot, CustomUser(id=user_id))
+                        continue
+                    _, entry = WaitlistEntry.objects.join(slot, CustomUser(id=user_id))
+                    if entry is not None:
+                        with lock:
+                            joined.append((entry.id, user_id))
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            list(executor.map(worker, [operations[i::6] for i in range(6)]))
+
+        slot.refresh_from_db()
+        booked = set(ClassBooking.objects.filter(class_slot=slot).values_list('user_id', flat=True))
+        waiting = set(WaitlistEntry.objects.filter(class_slot=slot).values_list('user_id', flat=True))
+        self.assertEqual(slot.booked_count, capacity)
+        self.assertEqual(len(booked), capacity)
+        self.assertFalse(booked & waiting)
+        # Every waiter who got a seat joined before every waiter still waiting.
+        promoted = [entry_id for entry_id, user_id in joined if user_id in booked]
+        still_waiting = [entry_id for entry_id, user_id in joined if user_id in waiting]
+        if promoted and still_waiting:
+            self.assertLess(max(promoted), min(still_waiting))
+
+
+class ListingQueryCountTests(TestCase):
+    '''
+    The listings must read any number of rows with a constant number of
+    queries. Every row gets its own instructor, class, slot and member
+    where the listing allows it, so a lazily loaded relation shows up as
+    an extra query per row.
+    '''
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.tomorrow = studio_today() + timedelta(days=1)
+
+    def call(self, view, user, url):
+        request = self.factory.get(url, {'timezone': 'America/New_York'})
+        force_authenticate(request, user=user)
+        response = view(request)
+        if hasattr(response, 'streaming_content'):
+            b''.join(response.streaming_content)
+        else:
+            response.render()
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assert_constant_queries(self, queries, seed, view, url):
+        for rows in (1, 20):
+            with self.subTest(rows=rows):
+                ClassBooking.objects.all().delete()
+                ClassSlot.objects.all().delete()
+                user = seed(rows)
+                # invalidate_available_classes() waits for a commit that
+                # never comes inside a TestCase.
+                available_classes_cache.bump()
+                with self.assertNumQueries(queries):
+                    self.call(view, user, url)
+
+    def seed_member_bookings(self, rows):
+        member = CustomUser.objects.get(id=create_members(1)[0])
+        for _ in range(rows):
+            create_bookings(create_slots(create_instructor(), [self.tomorrow]), [member.id], 1)
+        return member
+
+    def seed_instructor_bookings(self, rows):
+        instructor = create_instructor()
+        slots = create_slots(instructor, [self.tomorrow] * rows)
+        for slot, member_id in zip(slots, create_members(rows)):
+            create_bookings([slot], [member_id], 1)
+        return instructor
+
+    def test_get_booking_details(self):
+        self.assert_constant_queries(1, self.seed_member_bookings, get_booking_details, '/booking/')
+
+    def test_get_available_classes(self):
+        self.assert_constant_queries(1, self.seed_member_bookings, get_available_classes, '/class/')
+
+    def test_export_bookings(self):
+        self.assert_constant_queries(1, self.seed_instructor_bookings, export_bookings, '/booking/export')
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        slots = create_slots(create_instructor(), [studio_today() + timedelta(days=1)] * 3)
+        for slot, member_id in zip(slots, create_members(3)):
+            create_bookings([slot], [member_id], 1)
+        self.bookings = ClassBooking.objects.with_details().order_by('id')
+
+    async def test_async_export_streams_the_same_content(self):
+        for output in EXPORT_FORMATS:
+            with self.subTest(output=output):
+                expected = await sync_to_async(self.export)(output)
+                response = export_response(
+                    self.bookings, booking_representation, output, 'bookings', asynchronous=True
+                )
+                self.assertTrue(response.is_async)
+                self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), expected)
+
+    def export(self, output):
+        return b''.join(export_response(self.bookings, booking_representation, output, 'bookings').streaming_content)
+
+
+class ReminderTests(TestCase):
+
+    def setUp(self):
+        day = studio_today() + timedelta(days=1)
+        instructor = create_instructor()
+        # Three classes with slots at 6:00 to 9:00 (start times shared
+        # across classes) and one class at 14:00.
+        self.slots = create_slots(instructor, [day] * 3, per_class=4, first_hour=6)
+        self.later, = create_slots(instructor, [day], first_hour=14)
+        member, = create_members(1)
+        create_bookings(self.slots + [self.later], [member], len(self.slots) + 1)
+        self.now = studio_datetime(day, time(6, 30))
+        self.sent = []
+
+    def send(self, **options):
+        def record(notifications):
+            # One call per batch.
+            self.sent.append({notification.body for notification in notifications})
+            return len(notifications)
+
+        with mock.patch('class_booking.reminders.send_notifications', side_effect=record):
+            return list(send_reminders(240, now=self.now, **options))
+
+    def expected(self, slots):
+        return [
+            f'{slot.fitness_class.name} starts at {slot.start_time:%H:%M} on {slot.fitness_class.date}'
+            for slot in sorted(slots, key=lambda slot: (slot.start_at, slot.id))
+        ]
+
+    def test_due_slots_are_reminded_once_in_start_order_across_batches(self):
+        due = [slot for slot in self.slots if slot.start_time > time(6)]
+        batches = self.send(batch_size=4)
+        self.assertEqual([slots for slots, _, _ in batches], [4, 4, 1])
+        # Batches follow (start_at, id); within one the order does not matter.
+        expected = self.expected(due)
+        self.assertEqual(self.sent, [set(expected[i:i + 4]) for i in range(0, len(expected), 4)])
+        self.assertEqual(self.send(batch_size=4), [])
+        self.assertEqual(len(self.sent), 3)
+
+    def test_started_and_reminded_slots_are_skipped(self):
+        reminded = self.slots[-1]
+        ClassSlot.objects.filter(id=reminded.id).update(reminded_at=self.now)
+        self.send(batch_size=100)
+        reminded_ids = set(ClassSlot.objects.filter(reminded_at__isnull=False).values_list('id', flat=True))
+        started = {slot.id for slot in self.slots if slot.start_time == time(6)}
+        self.assertFalse(started & reminded_ids)
+        self.assertNotIn(self.later.id, reminded_ids)
+        self.assertEqual(len(self.sent[0]), 9 - 1)
@@ -1,8 +1,12 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
 
 urlpatterns = [
        path('<int:slot_id>/book', views.book_slot, name='book_slot'),
-       path('', views.get_booking_details, name='get_booking_details')
+       path('<int:slot_id>/cancel', views.cancel_booking, name='cancel_booking'),
+       path('<int:slot_id>/waitlist', views.slot_waitlist, name='slot_waitlist'),
+       path('export', views.export_bookings, name='export_bookings'),
+       path('', views.get_booking_details_async if settings.ASYNC_READ_VIEWS else views.get_booking_details, name='get_booking_details')
 ]
\ No newline at end of file
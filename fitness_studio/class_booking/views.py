@@ -1,14 +1,24 @@
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework import status
-from datetime import datetime
-import pytz
+import json
+import logging
 from rest_framework.permissions import IsAuthenticated
 
-from core.permissions import IsUser
-from .models import ClassBooking
+from django.utils import timezone
+
+from core.timezones import get_timezone
+from core.permissions import IsInstructor, IsUser
+from core.profiling import timed
+from core.authentication import authenticate_async
+from core.http import json_response
+from core.streaming import EXPORT_FORMATS, export_response, is_asgi
+from .models import ClassBooking, WaitlistEntry
+from .exceptions import BookingError
 from fitness_class.models import ClassSlot
-from .serializers import ClassBookingSerializer
+from .serializers import booking_representation
+
+logger = logging.getLogger(__name__)
 
 # Create your views here.
 @api_view(['POST'])
@@ -27,30 +37,121 @@ def book_slot(request, slot_id):
     Responses:
         - Success: If the slot is booked successfully, returns a status of "Success" 
           along with the message.
-        - Error: If the class is filled or the class has past current date or time, 
+        - Error: If the class is filled (see the waitlist endpoint), the user has 
+          already booked the slot or the class has past current date or time, 
           returns a status of "Error" along with error message.
         - Exception: In case of an unexpected error, returns a status of "Error" 
           with the exception message.
     '''
     try:
-        # IST timezone
-        ist = pytz.timezone('Asia/Kolkata')
-        # Current datetime in IST
-        today_ist = datetime.now(ist)
-        today_date_ist = today_ist.date()
-        today_time_ist = today_ist.time()
-
         slot = ClassSlot.objects.select_related('fitness_class').get(id=slot_id)
-        if (slot.fitness_class.date == today_date_ist and slot.start_time > today_time_ist) or (slot.fitness_class.date > today_date_ist):
-            slot_booking_count = ClassBooking.objects.filter(class_slot=slot).count()
-            if slot.fitness_class.member_max_count > slot_booking_count:
-                ClassBooking.objects.create(class_slot=slot, user=request.user)
-                return Response({"status":"Success", "message":"Slot Booked"}, status=status.HTTP_201_CREATED)
-            return Response({"status":"Error", "message":"This Class has already been filled"}, status=status.HTTP_400_BAD_REQUEST)
+        if not has_started(slot):
+            try:
+                booking = ClassBooking.objects.book(slot, request.user)
+            except BookingError as e:
+                logger.info('booking rejected slot_id=%s user_id=%s reason=%s', slot_id, request.user.id, type(e).__name__)
+                return Response({"status":"Error", "message":str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            logger.info('slot booked booking_id=%s slot_id=%s user_id=%s', booking.id, slot_id, request.user.id)
+            return Response({"status":"Success", "message":"Slot Booked"}, status=status.HTTP_201_CREATED)
         return Response({"status":"Error", "message":"This Class has already been finished or ongoing"}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    
+
+@api_view(['POST'])
+@permission_classes([IsUser])
+def cancel_booking(request, slot_id):
+    '''
+    Cancel the logged in user's booking of a slot.
+
+    The user must include their access token in the request 
+    headers to authenticate the request. The id of the booked slot 
+    should be passed with the url. If members are waiting for the 
+    slot, the seat goes to the first of them.
+
+    HTTP Method:
+        POST
+
+    Responses:
+        - Success: If the booking is cancelled, returns a status of "Success" 
+          along with the message.
+        - Error: If the user has not booked the slot or the class has already 
+          started, returns a status of "Error" along with error message.
+        - Exception: In case of an unexpected error, returns a status of "Error" 
+          with the exception message.
+    '''
+    try:
+        slot = ClassSlot.objects.select_related('fitness_class').get(id=slot_id)
+        if has_started(slot):
+            return Response({"status":"Error", "message":"This Class has already been finished or ongoing"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            promoted = ClassBooking.objects.cancel(slot, request.user)
+        except BookingError as e:
+            return Response({"status":"Error", "message":str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        logger.info(
+            'booking cancelled slot_id=%s user_id=%s promoted_user_id=%s',
+            slot_id, request.user.id, promoted.user_id if promoted else None,
+        )
+        return Response({"status":"Success", "message":"Booking Cancelled"}, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST', 'DELETE'])
+@permission_classes([IsUser])
+def slot_waitlist(request, slot_id):
+    '''
+    Join or leave the waitlist of a full slot.
+
+    The user must include their access token in the request 
+    headers to authenticate the request. The id of the slot should 
+    be passed with the url. Members on the waitlist are booked 
+    automatically, first come first served, when a booking of the 
+    slot is cancelled, so there is no need to retry book requests.
+
+    HTTP Method:
+        POST: Join the waitlist. If a seat is free, it is booked right away.
+        DELETE: Leave the waitlist.
+
+    Responses:
+        - Success: On POST, returns a status of "Success" along with the message 
+          and, if the user is waiting, their position in the waitlist. On DELETE, 
+          returns a status of "Success" along with the message.
+        - Error: If the user has already booked the slot or is already (or not) 
+          on the waitlist, or the class has already started, returns a status of 
+          "Error" along with error message.
+        - Exception: In case of an unexpected error, returns a status of "Error" 
+          with the exception message.
+    '''
+    try:
+        slot = ClassSlot.objects.select_related('fitness_class').get(id=slot_id)
+        if request.method == 'DELETE':
+            try:
+                WaitlistEntry.objects.leave(slot, request.user)
+            except BookingError as e:
+                return Response({"status":"Error", "message":str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            logger.info('waitlist left slot_id=%s user_id=%s', slot_id, request.user.id)
+            return Response({"status":"Success", "message":"Removed from the Waitlist"}, status=status.HTTP_200_OK)
+
+        if has_started(slot):
+            return Response({"status":"Error", "message":"This Class has already been finished or ongoing"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            booking, entry = WaitlistEntry.objects.join(slot, request.user)
+        except BookingError as e:
+            return Response({"status":"Error", "message":str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if booking is not None:
+            logger.info('slot booked booking_id=%s slot_id=%s user_id=%s', booking.id, slot_id, request.user.id)
+            return Response({"status":"Success", "message":"Slot Booked"}, status=status.HTTP_201_CREATED)
+        position = WaitlistEntry.objects.position(entry)
+        logger.info('waitlist joined slot_id=%s user_id=%s position=%d', slot_id, request.user.id, position)
+        return Response({"status":"Success", "message":"Added to the Waitlist", "data":{"position":position}}, status=status.HTTP_201_CREATED)
+    except Exception as e:
+        return Response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def has_started(slot):
+    '''
+    Whether the slot has already started (or finished).
+    '''
+    return slot.start_at <= timezone.now()
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_booking_details(request):
@@ -78,18 +179,93 @@ def get_booking_details(request):
           with the exception message.
     '''
     try:
-        if request.data.get('email'):
-            bookings = ClassBooking.objects.filter(user__email=request.data.get('email'))
-        else:
-            bookings = ClassBooking.objects.filter(user__id=request.user.id)
+        bookings = bookings_queryset(request.user, request.data.get('email'))
+        # An invalid or missing timezone falls back to the studio timezone.
+        target_timezone = get_timezone(request.query_params.get('timezone'))
+        bookings = list(bookings)
+        with timed('serialize'):
+            data = [booking_representation(booking, target_timezone) for booking in bookings]
 
-        # For checking the entered timezone is valid.
-        try:
-            pytz.timezone(request.query_params.get('timezone'))
-            serializer = ClassBookingSerializer(bookings, many=True, target_timezone=request.query_params.get('timezone'))
-        except pytz.UnknownTimeZoneError:     
-            serializer = ClassBookingSerializer(bookings, many=True)
-            
-        return Response({"status":"Success", "data":serializer.data}, status=status.HTTP_200_OK)
+        return Response({"status":"Success", "data":data}, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsInstructor])
+def export_bookings(request):
+    '''
+    Export every booking of the logged in instructor's classes.
+
+    The user must include their access token in the request 
+    headers to authenticate the request. The bookings are streamed 
+    as a file download, so any number of bookings can be exported.
+
+    HTTP Method:
+        GET
+
+    Query Params:
+        - output (str): File format, json, ndjson or csv (default json).
+        - timezone (str): Timezone to show the slot times in (not mandatory).
+
+    Responses:
+        - Success: Streams the bookings in the same shape as the booking details 
+          endpoint, ordered by id. CSV files have one column per field, with 
+          nested fields named like class_slot.fitness_class.name.
+        - Error: If the output format is not supported, returns a status of 
+          "Error" along with the validation error.
+        - Exception: In case of an unexpected error, returns a status of "Error" 
+          with the exception message.
+    '''
+    try:
+        output = request.query_params.get('output', 'json')
+        if output not in EXPORT_FORMATS:
+            return Response({"status":"Error", "data":{"output":[f"Choose one of {', '.join(EXPORT_FORMATS)}."]}}, status=status.HTTP_400_BAD_REQUEST)
+        # An invalid or missing timezone falls back to the studio timezone.
+        target_timezone = get_timezone(request.query_params.get('timezone'))
+        bookings = ClassBooking.objects.with_details().filter(
+            class_slot__fitness_class__instructor_id=request.user.id
+        ).order_by('id')
+        logger.info('bookings export instructor_id=%s output=%s', request.user.id, output)
+        return export_response(
+            bookings, lambda booking: booking_representation(booking, target_timezone), output, 'bookings',
+            asynchronous=is_asgi(request),
+        )
     except Exception as e:
-        return Response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+async def get_booking_details_async(request):
+    '''
+    Async version of get_booking_details for ASGI deployments.
+
+    Takes the same request data and query params and returns the same 
+    responses, reading the bookings with the async ORM. Used instead of 
+    get_booking_details when ASYNC_READ_VIEWS is enabled.
+    '''
+    if request.method != 'GET':
+        return json_response({"detail": f'Method "{request.method}" not allowed.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    user, error_response = await authenticate_async(request, IsAuthenticated)
+    if error_response is not None:
+        return error_response
+    try:
+        # The email is sent in a JSON body, like for the DRF view.
+        body = json.loads(request.body) if request.body else {}
+        email = body.get('email') if isinstance(body, dict) else None
+        bookings = bookings_queryset(user, email)
+        # An invalid or missing timezone falls back to the studio timezone.
+        target_timezone = get_timezone(request.GET.get('timezone'))
+        bookings = [booking async for booking in bookings.aiterator()]
+        with timed('serialize'):
+            data = [booking_representation(booking, target_timezone) for booking in bookings]
+
+        return json_response({"status":"Success", "data":data}, status=status.HTTP_200_OK)
+    except Exception as e:
+        return json_response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def bookings_queryset(user, email=None):
+    '''
+    Bookings of the user with the given email, or of the user itself.
+    '''
+    if email:
+        return ClassBooking.objects.with_details().filter(user__email=email)
+    return ClassBooking.objects.with_details().filter(user__id=user.id)
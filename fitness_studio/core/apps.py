@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.utils.module_loading import autodiscover_modules
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from .profiling import install_query_recorder
+        connection_created.connect(install_query_recorder)
+        # Registers the background task handlers of every app.
+        autodiscover_modules('tasks')
@@ -0,0 +1,116 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .caching import LRUCache
+from .http import json_response
+
+# Full user rows loaded for StudioTokenUser attribute fallbacks.
+_user_cache = LRUCache(maxsize=settings.USER_CACHE_SIZE)
+
+
+def get_cached_user(user_id):
+    '''
+    Load a CustomUser by id through a bounded TTL cache.
+    '''
+    user = _user_cache.get(user_id)
+    if user is None:
+        user = get_user_model().objects.get(id=user_id)
+        _user_cache.set(user_id, user, settings.USER_CACHE_TIMEOUT)
+    return user
+
+
+class StudioTokenUser(TokenUser):
+    '''
+    Lightweight user built from the access token claims (user_id, name, role).
+
+    It is enough for the role permissions in core.permissions and for views
+    that only need the user's id. Any other attribute (e.g. email) is read
+    from the full CustomUser, which is loaded from the DB on first use and
+    cached for USER_CACHE_TIMEOUT seconds.
+    '''
+
+    @cached_property
+    def name(self):
+        return self.token.get('name', '')
+
+    @cached_property
+    def role(self):
+        return self.token.get('role')
+
+    @property
+    def instance(self):
+        return get_cached_user(self.id)
+
+    def __getattr__(self, name):
+        # Only called for attributes the token does not provide.
+        if name.startswith('_') or name == 'token':
+            raise AttributeError(name)
+        try:
+            instance = self.instance
+        except ObjectDoesNotExist:
+            # The user was deleted after the token was issued; hasattr()
+            # must still work.
+            raise AttributeError(name)
+        return getattr(instance, name)
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    '''
+    JWT authentication that does not query the database on every request.
+
+    request.user is a StudioTokenUser built from the validated token. Role
+    or name changes take effect when the user gets a new access token.
+    Enable with JWT_STATELESS_AUTH in settings.
+    '''
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        return StudioTokenUser(validated_token)
+
+
+async def authenticate_async(request, permission_class):
+    '''
+    Authenticate and authorize a plain async view like the DRF views are.
+
+    Uses the same JWT authentication as REST_FRAMEWORK (stateless when
+    JWT_STATELESS_AUTH is set, otherwise the user is loaded in a thread)
+    and the given core.permissions class. Returns (user, None), or
+    (None, response) with the 401/403 response DRF would have sent.
+    '''
+    stateless = settings.JWT_STATELESS_AUTH
+    authenticator = StatelessJWTAuthentication() if stateless else JWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None, _authentication_error({"detail": "Authentication credentials were not provided."})
+
+    try:
+        validated_token = authenticator.get_validated_token(raw_token)
+        if stateless:
+            user = authenticator.get_user(validated_token)
+        else:
+            user = await sync_to_async(authenticator.get_user)(validated_token)
+    except AuthenticationFailed as e:
+        detail = e.detail if isinstance(e.detail, dict) else {"detail": e.detail}
+        return None, _authentication_error(detail)
+
+    request.user = user
+    if not permission_class().has_permission(request, None):
+        return None, json_response({"detail": "You do not have permission to perform this action."}, status=403)
+    return user, None
+
+
+def _authentication_error(detail):
+    response = json_response(detail, status=401)
+    response['WWW-Authenticate'] = f'{api_settings.AUTH_HEADER_TYPES[0]} realm="api"'
+    return response
@@ -0,0 +1,58 @@
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def benchmark_database(verbosity=0, on_disk=False):
+    '''
+    Run the enclosed block against a throwaway test database.
+
+    Benchmarks seed large amounts of data, so they must never touch the
+    configured database. The test database is created the same way the
+    test runner does it and destroyed afterwards.
+
+    SQLite benchmarks run in shared memory, which does not behave like a
+    real database under concurrent writers. Pass on_disk=True for
+    multi-threaded benchmarks to get a temporary database file instead.
+    '''
+    old_name = connection.settings_dict['NAME']
+    old_test_name = connection.settings_dict['TEST']['NAME']
+    if connection.vendor == 'sqlite':
+        path = None
+        if on_disk:
+            fd, path = tempfile.mkstemp(suffix='.sqlite3')
+            os.close(fd)
+        connection.settings_dict['TEST']['NAME'] = path
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        connection.settings_dict['TEST']['NAME'] = old_test_name
+
+
+def measure(func, repeat=5):
+    '''
+    Call func() `repeat` times and return timing stats in milliseconds.
+    '''
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'max': max(timings),
+    }
+
+
+def format_timings(label, timings):
+    return '{:<24} min {:>9.2f} ms   median {:>9.2f} ms   max {:>9.2f} ms'.format(
+        label, timings['min'], timings['median'], timings['max']
+    )
@@ -0,0 +1,139 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class LRUCache:
+    '''
+    Small thread-safe, per-process LRU cache with optional per-entry timeouts.
+    '''
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires_at = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class VersionedCache:
+    '''
+    Cache whose entries are invalidated all at once by bumping a version.
+
+    The version counter lives in Django's cache so every process sees the
+    bump. Entries go to Django's cache too, except when it is the
+    local-memory backend: that one is per process anyway, so a plain LRU
+    avoids its pickling and locking overhead. Hits and misses are counted
+    per process. The a-prefixed methods are for async views: they await
+    Django's async cache API instead of blocking the event loop.
+    '''
+
+    def __init__(self, namespace, timeout=30, maxsize=1024):
+        self.namespace = namespace
+        self.timeout = timeout
+        self.version_key = f'{namespace}:version'
+        self.local = LRUCache(maxsize)
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    @property
+    def store(self):
+        return self.local if isinstance(caches['default'], LocMemCache) else cache
+
+    def version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, 1, None)
+            version = cache.get(self.version_key, 1)
+        return version
+
+    async def aversion(self):
+        version = await cache.aget(self.version_key)
+        if version is None:
+            await cache.aadd(self.version_key, 1, None)
+            version = await cache.aget(self.version_key, 1)
+        return version
+
+    def bump(self):
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.set(self.version_key, 2, None)
+
+    def make_key(self, *parts):
+        return self._key(self.version(), parts)
+
+    async def amake_key(self, *parts):
+        return self._key(await self.aversion(), parts)
+
+    def _key(self, version, parts):
+        digest = hashlib.md5(repr(parts).encode()).hexdigest()
+        return f'{self.namespace}:v{version}:{digest}'
+
+    def get(self, key):
+        return self._count(self.store.get(key))
+
+    async def aget(self, key):
+        store = self.store
+        # The local LRU never blocks, only Django's cache has to be awaited.
+        value = store.get(key) if store is self.local else await store.aget(key)
+        return self._count(value)
+
+    def _count(self, value):
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.store.set(key, value, self.timeout)
+
+    async def aset(self, key, value):
+        store = self.store
+        if store is self.local:
+            store.set(key, value, self.timeout)
+        else:
+            await store.aset(key, value, self.timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 3) if lookups else None,
+        }
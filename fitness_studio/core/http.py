@@ -0,0 +1,12 @@
+from django.http import JsonResponse
+
+# Same output as DRF's JSONRenderer, so the async views answer with the
+# same bytes as their DRF counterparts.
+JSON_DUMPS_PARAMS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+def json_response(data, status=200, **kwargs):
+    '''
+    JsonResponse for plain async views, which cannot use DRF's Response.
+    '''
+    return JsonResponse(data, status=status, safe=False, json_dumps_params=JSON_DUMPS_PARAMS, **kwargs)
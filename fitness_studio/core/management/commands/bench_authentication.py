@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from core.authentication import StatelessJWTAuthentication
+from core.benchmark import benchmark_database
+from core.seed import create_members
+from user.models import CustomUser
+from user.serializers import MyTokenObtainPairSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the database-backed JWT authentication with the stateless one: '
+        'queries and time per authenticated request. Runs against a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000, help='Requests authenticated per backend.')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        with benchmark_database():
+            user = CustomUser.objects.get(id=create_members(1)[0])
+            token = MyTokenObtainPairSerializer.get_token(user).access_token
+            header = f'Bearer {token}'
+
+            for label, backend in (('JWTAuthentication', JWTAuthentication()),
+                                   ('StatelessJWTAuthentication', StatelessJWTAuthentication())):
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    for _ in range(options['requests']):
+                        request = Request(factory.get('/class/', HTTP_AUTHORIZATION=header))
+                        authenticated, _token = backend.authenticate(request)
+                        authenticated.role
+                    elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f'{label:<28} {len(queries) / options["requests"]:.2f} queries/request   '
+                    f'{elapsed / options["requests"] * 1e6:.1f} us/request'
+                )
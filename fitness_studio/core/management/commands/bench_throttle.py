@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.throttling import check_throttle, get_buckets
+from user.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the cost of a rate limit check per throttle backend, for clients identified '
+        'by access token and by IP address.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checks', type=int, default=20000, help='Checks per backend and client kind.')
+        parser.add_argument('--clients', type=int, default=1000, help='Distinct clients the checks are spread over.')
+        parser.add_argument('--url-name', default='book_slot', help='URL name whose THROTTLE_RATES entry is used.')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        clients = range(options['clients'])
+        kinds = {
+            'token': [
+                factory.post('/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(CustomUser(id=i + 1))}')
+                for i in clients
+            ],
+            'ip': [factory.post('/', REMOTE_ADDR=f'10.0.{i // 256}.{i % 256}') for i in clients],
+        }
+        for backend in ('LocalBuckets', 'CacheBuckets'):
+            with override_settings(THROTTLE_BACKEND=f'core.throttling.{backend}'):
+                for kind, requests in kinds.items():
+                    # Fresh buckets for every run.
+                    get_buckets.cache_clear()
+                    throttled = 0
+                    start = time.perf_counter()
+                    for i in range(options['checks']):
+                        throttled += bool(check_throttle(requests[i % len(requests)], options['url_name']))
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(
+                        f'{backend:<14} {kind:<6} {elapsed / options["checks"] * 1e6:8.1f} us/check   '
+                        f'{throttled} throttled'
+                    )
+        get_buckets.cache_clear()
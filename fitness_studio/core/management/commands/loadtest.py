@@ -0,0 +1,90 @@
+import json
+import threading
+import time as timer
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire concurrent GET requests at a running server and report throughput and '
+        'latency percentiles. Run it once against a WSGI server (e.g. gunicorn) and '
+        'once against an ASGI server (e.g. uvicorn with ASYNC_READ_VIEWS=1) to compare them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server to load.')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Path to request, may be repeated (default: /class/ and /booking/).')
+        parser.add_argument('--token', help='Access token sent as a Bearer token.')
+        parser.add_argument('--email', help='Log in with this user instead of passing --token.')
+        parser.add_argument('--password', help='Password of --email.')
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight at once.')
+        parser.add_argument('--requests', type=int, default=2000, help='Total number of requests.')
+        parser.add_argument('--timeout', type=float, default=30, help='Seconds before a request fails.')
+
+    def handle(self, *args, **options):
+        base_url = options['base_url'].rstrip('/')
+        paths = options['paths'] or ['/class/', '/booking/']
+        token = options['token'] or self.login(base_url, options['email'], options['password'], options['timeout'])
+        headers = {'Authorization': f'Bearer {token}'}
+        total = options['requests']
+
+        latencies = {path: [] for path in paths}
+        statuses = Counter()
+        lock = threading.Lock()
+
+        def fire(i):
+            path = paths[i % len(paths)]
+            request = urllib.request.Request(base_url + path, headers=headers)
+            start = timer.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=options['timeout']) as response:
+                    response.read()
+                    code = response.status
+            except urllib.error.HTTPError as e:
+                code = e.code
+            except (urllib.error.URLError, OSError):
+                code = 'error'
+            elapsed = (timer.perf_counter() - start) * 1000
+            with lock:
+                latencies[path].append(elapsed)
+                statuses[code] += 1
+
+        start = timer.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            list(executor.map(fire, range(total)))
+        elapsed = timer.perf_counter() - start
+
+        self.stdout.write(
+            f'{total} requests in {elapsed:.2f} s   {total / elapsed:.1f} req/s   '
+            f'concurrency {options["concurrency"]}   status {dict(statuses)}'
+        )
+        for path, timings in latencies.items():
+            timings.sort()
+            if not timings:
+                continue
+            self.stdout.write(
+                f'{path:<24} p50 {percentile(timings, 50):>8.1f} ms   p95 {percentile(timings, 95):>8.1f} ms   '
+                f'p99 {percentile(timings, 99):>8.1f} ms   max {timings[-1]:>8.1f} ms'
+            )
+
+    def login(self, base_url, email, password, timeout):
+        if not email or not password:
+            raise CommandError('Pass --token, or --email and --password to log in.')
+        request = urllib.request.Request(
+            base_url + '/user/login',
+            data=json.dumps({'email': email, 'password': password}).encode(),
+            headers={'Content-Type': 'application/json'},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return json.loads(response.read())['access']
+        except urllib.error.HTTPError as e:
+            raise CommandError(f'Login failed with status {e.code}: {e.read().decode()}')
@@ -0,0 +1,45 @@
+import logging
+import time as timer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.tasks import run_batch
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Run background tasks (booking confirmations and other side effects queued by requests). '
+        'Several workers can run at once; each task is claimed by one of them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.TASK_BATCH_SIZE, help='Tasks claimed per batch.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Exit once no task is due instead of polling.')
+
+    def handle(self, *args, **options):
+        totals = [0, 0, 0]
+        try:
+            while True:
+                close_old_connections()
+                start = timer.perf_counter()
+                done, retried, failed = run_batch(options['batch_size'])
+                elapsed = timer.perf_counter() - start
+                processed = done + retried + failed
+                if processed:
+                    totals = [total + count for total, count in zip(totals, (done, retried, failed))]
+                    logger.info(
+                        'task batch done=%d retried=%d failed=%d ms=%.1f tasks_per_s=%.0f',
+                        done, retried, failed, elapsed * 1000, processed / elapsed,
+                    )
+                if processed < options['batch_size']:
+                    if options['once']:
+                        break
+                    timer.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f'{totals[0]} task(s) done, {totals[1]} to retry, {totals[2]} failed.')
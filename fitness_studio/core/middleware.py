@@ -0,0 +1,79 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.deprecation import MiddlewareMixin
+
+from . import profiling
+from .http import json_response
+from .throttling import check_throttle, retry_after
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilingMiddleware:
+    '''
+    Measure every request: wall time, database query count and time, and
+    named timings such as serialization (see core.profiling.timed).
+
+    The numbers are sent back in a Server-Timing header and aggregated per
+    URL name in core.profiling.stats. Works for sync and async views.
+    '''
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = profiling.start_profile()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiling.end_profile()
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        profile = profiling.start_profile()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiling.end_profile()
+        return self.finish(request, response, profile)
+
+    def finish(self, request, response, profile):
+        profile.finish()
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        profiling.stats.record(url_name, profile)
+        response['Server-Timing'] = profile.server_timing()
+        logger.debug(
+            'request url_name=%s status=%s wall_ms=%.1f queries=%d db_ms=%.1f',
+            url_name, response.status_code, profile.wall_ms, profile.queries, profile.db_ms,
+        )
+        return response
+
+
+class ThrottleMiddleware(MiddlewareMixin):
+    '''
+    Rate limit the URL names in THROTTLE_RATES with a token bucket per
+    client (user id from the access token, or IP address), see
+    core.throttling.
+
+    Runs before the view, so a throttled request gets its 429 without any
+    database query.
+    '''
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        wait = check_throttle(request, url_name)
+        if not wait:
+            return None
+        logger.info('request throttled url_name=%s retry_after_s=%.1f', url_name, wait)
+        response = json_response(
+            {"status":"Error", "message":"Too many requests, please try again later."}, status=429
+        )
+        response['Retry-After'] = retry_after(wait)
+        return response
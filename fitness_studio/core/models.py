@@ -0,0 +1,38 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    '''
+    A unit of background work, run by the run_tasks worker (see core.tasks).
+
+    Tasks are written in the same transaction as the change that causes
+    them, so the table doubles as an outbox: a task exists if and only if
+    its transaction committed. Finished tasks are deleted; tasks that keep
+    failing are kept with status failed and their last error.
+    '''
+
+    class Status(models.TextChoices):
+        PENDING = 'pending'
+        RUNNING = 'running'
+        FAILED = 'failed'
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    # Worker holding a running task, and until when.
+    claimed_by = models.CharField(max_length=32, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Due pending tasks in order, and expired running ones.
+            models.Index(fields=['status', 'run_after', 'id'], name='task_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.id}'
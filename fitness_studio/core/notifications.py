@@ -0,0 +1,86 @@
+import json
+import sys
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class Notification:
+    '''
+    A message to one member, e.g. a booking confirmation or a reminder.
+    '''
+
+    def __init__(self, to, subject, body):
+        self.to = to
+        self.subject = subject
+        self.body = body
+
+    def as_dict(self):
+        return {'to': self.to, 'subject': self.subject, 'body': self.body}
+
+
+class BaseBackend:
+    '''
+    Delivers notifications. Backends get whole batches so that a real
+    email or push backend can reuse one connection per batch.
+    '''
+
+    def send_messages(self, notifications):
+        '''
+        Send the notifications and return how many were sent.
+        '''
+        raise NotImplementedError
+
+
+class ConsoleBackend(BaseBackend):
+    '''
+    Writes notifications to stdout, one line each. Stand-in for email or
+    push delivery in development.
+    '''
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def send_messages(self, notifications):
+        lines = [
+            f'notification to={notification.to} subject="{notification.subject}" body="{notification.body}"\n'
+            for notification in notifications
+        ]
+        with self._lock:
+            self.stream.write(''.join(lines))
+            self.stream.flush()
+        return len(lines)
+
+
+class FileBackend(BaseBackend):
+    '''
+    Appends notifications as JSON lines to NOTIFICATION_FILE_PATH.
+    '''
+
+    def __init__(self, path=None):
+        self.path = path or settings.NOTIFICATION_FILE_PATH
+        self._lock = threading.Lock()
+
+    def send_messages(self, notifications):
+        lines = ''.join(json.dumps(notification.as_dict()) + '\n' for notification in notifications)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as output:
+            output.write(lines)
+        return len(notifications)
+
+
+@lru_cache(maxsize=None)
+def get_backend(path=None):
+    '''
+    The configured NOTIFICATION_BACKEND (or the backend at `path`), created
+    once per process.
+    '''
+    return import_string(path or settings.NOTIFICATION_BACKEND)()
+
+
+def send_notifications(notifications):
+    if not notifications:
+        return 0
+    return get_backend().send_messages(notifications)
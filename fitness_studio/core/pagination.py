@@ -0,0 +1,25 @@
+import base64
+import json
+
+
+def encode_cursor(values):
+    '''
+    Encode the sort key of the last row of a page into an opaque cursor.
+    '''
+    payload = json.dumps([str(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor, size):
+    '''
+    Decode a cursor made by encode_cursor back into its `size` string values.
+
+    Raises ValueError if the cursor has been tampered with or is malformed.
+    '''
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, str) for v in values):
+        raise ValueError('Invalid cursor')
+    return values
@@ -0,0 +1,139 @@
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current_profile = ContextVar('current_profile', default=None)
+
+
+class RequestProfile:
+    '''
+    Wall time, database queries and named timings of a single request.
+    '''
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.wall_ms = None
+        self.queries = 0
+        self.db_ms = 0.0
+        self.timings = defaultdict(float)
+
+    def finish(self):
+        self.wall_ms = (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self):
+        metrics = [
+            f'total;dur={self.wall_ms:.1f}',
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"',
+        ]
+        metrics.extend(f'{name};dur={duration:.1f}' for name, duration in self.timings.items())
+        return ', '.join(metrics)
+
+
+def record_query(execute, sql, params, many, context):
+    '''
+    Database execute wrapper that times queries into the current profile.
+
+    It is installed once on every connection (see CoreConfig.ready) and
+    finds the request through a context variable, so it also sees the
+    queries async views run in sync_to_async threads.
+    '''
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.db_ms += (time.perf_counter() - start) * 1000
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # connection_created receiver
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def start_profile():
+    profile = RequestProfile()
+    _current_profile.set(profile)
+    return profile
+
+
+def end_profile():
+    _current_profile.set(None)
+
+
+@contextmanager
+def timed(name):
+    '''
+    Add the time spent in the block to the current request's `name` timing.
+
+    Costs two perf_counter() calls, and nothing is recorded outside of a
+    profiled request.
+    '''
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.timings[name] += (time.perf_counter() - start) * 1000
+
+
+def percentile(ordered, pct):
+    # Nearest-rank percentile of an already sorted list.
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+class ProfileStats:
+    '''
+    Per-process aggregate of request profiles, keyed by URL name.
+
+    Only the most recent `window` requests of each URL name are kept, so
+    memory stays bounded and percentiles follow the current load.
+    '''
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, url_name, profile):
+        sample = (profile.wall_ms, profile.db_ms, profile.queries, profile.timings.get('serialize', 0.0))
+        with self._lock:
+            self._samples[url_name].append(sample)
+            self._counts[url_name] += 1
+
+    def summary(self):
+        with self._lock:
+            samples = {url_name: list(values) for url_name, values in self._samples.items()}
+            counts = dict(self._counts)
+
+        summary = {}
+        for url_name, values in samples.items():
+            walls = sorted(value[0] for value in values)
+            summary[url_name] = {
+                'requests': counts[url_name],
+                'p50_ms': round(percentile(walls, 50), 2),
+                'p95_ms': round(percentile(walls, 95), 2),
+                'p99_ms': round(percentile(walls, 99), 2),
+                'avg_db_ms': round(sum(value[1] for value in values) / len(values), 2),
+                'avg_queries': round(sum(value[2] for value in values) / len(values), 2),
+                'avg_serialize_ms': round(sum(value[3] for value in values) / len(values), 2),
+            }
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+stats = ProfileStats()
@@ -0,0 +1,117 @@
+'''
+Seed data shared by the tests and the benchmark commands.
+
+The create_* helpers write to the database with bulk INSERTs and keep
+ClassSlot.booked_count in step with the bookings they make. build_slots
+and build_bookings return unsaved rows for benchmarks that measure
+serialization rather than the database.
+'''
+
+from datetime import date, datetime, time, timedelta
+
+from class_booking.models import ClassBooking
+from fitness_class.models import ClassSlot, FitnessClass
+from user.models import CustomUser
+
+
+def create_instructor(name='Instructor'):
+    number = CustomUser.objects.count()
+    return CustomUser.objects.create(name=name, email=f'instructor{number}@seed.com', role='instructor')
+
+
+def create_members(count):
+    '''
+    Ids of `count` new members, in creation order.
+    '''
+    first = CustomUser.objects.count()
+    members = CustomUser.objects.bulk_create(
+        CustomUser(name=f'Member {first + i}', email=f'member{first + i}@seed.com') for i in range(count)
+    )
+    return [member.id for member in members]
+
+
+def create_slots(instructor, dates, per_class=1, class_types=('yoga',), member_max_count=50,
+                 first_hour=6, minutes=60):
+    '''
+    One class per date (class types taken in turn) with `per_class` slots
+    starting on the hour from first_hour. Returns the slots.
+    '''
+    first = FitnessClass.objects.count()
+    fitness_classes = FitnessClass.objects.bulk_create(
+        FitnessClass(
+            name=f'Class {first + i}', instructor=instructor, class_type=class_types[i % len(class_types)],
+            date=day, member_max_count=member_max_count,
+        )
+        for i, day in enumerate(dates)
+    )
+    starts = [time(first_hour + i) for i in range(per_class)]
+    ends = [(datetime.combine(date.min, start) + timedelta(minutes=minutes)).time() for start in starts]
+    return ClassSlot.objects.bulk_create(
+        (
+            ClassSlot.build(fitness_class, start, end)
+            for fitness_class in fitness_classes
+            for start, end in zip(starts, ends)
+        ),
+        batch_size=5000,
+    )
+
+
+def create_bookings(slots, member_ids, count):
+    '''
+    Make `count` bookings, filling the slots in turn with distinct members
+    (at most len(member_ids) per slot, ignoring member_max_count), and
+    update booked_count. Pass the same member_ids on every call for a
+    slot. Returns the number of bookings made.
+    '''
+    booked = dict(ClassSlot.objects.filter(id__in=[slot.id for slot in slots]).values_list('id', 'booked_count'))
+    bookings = []
+    counts = {}
+    for slot in slots:
+        if count <= 0:
+            break
+        start = booked[slot.id]
+        take = min(count, len(member_ids) - start)
+        if take <= 0:
+            continue
+        bookings.extend(
+            ClassBooking(class_slot_id=slot.id, user_id=user_id) for user_id in member_ids[start:start + take]
+        )
+        counts[slot.id] = start + take
+        count -= take
+    ClassBooking.objects.bulk_create(bookings, batch_size=5000)
+    ClassSlot.objects.bulk_update(
+        [ClassSlot(id=slot_id, booked_count=booked_count) for slot_id, booked_count in counts.items()],
+        ['booked_count'], batch_size=1000,
+    )
+    return len(bookings)
+
+
+def build_slots(rows):
+    '''
+    Unsaved slots with their class and instructor, ten slots per class.
+    '''
+    instructor = CustomUser(id=1, name='Bench', email='bench@instructor.com', role='instructor')
+    first_date = date(2030, 1, 1)
+    slots = []
+    for i in range(rows):
+        if i % 10 == 0:
+            fitness_class = FitnessClass(
+                id=i // 10 + 1, name=f'Bench {i // 10}', instructor=instructor,
+                class_type='yoga', date=first_date + timedelta(days=i // 100),
+            )
+        hour = 6 + i % 10
+        slots.append(ClassSlot.build(
+            fitness_class, time(hour), time(hour, 45), id=i + 1, booked_count=i % 50
+        ))
+    return slots
+
+
+def build_bookings(rows):
+    '''
+    Unsaved bookings of one member spread over build_slots(rows).
+    '''
+    member = CustomUser(id=2, name='Member', email='member@bench.com')
+    return [
+        ClassBooking(id=slot.id, class_slot=slot, user=member)
+        for slot in build_slots(rows)
+    ]
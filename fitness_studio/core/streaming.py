@@ -0,0 +1,133 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from .http import JSON_DUMPS_PARAMS
+
+EXPORT_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def export_response(queryset, represent, output, filename, asynchronous=False):
+    '''
+    Stream a queryset as a JSON, NDJSON or CSV download.
+
+    Rows are fetched in chunks of EXPORT_CHUNK_SIZE and each one is
+    converted with represent(row) and written out before the next is read,
+    so memory use does not depend on the number of rows. The JSON output
+    has the same {"status", "data"} shape as the listing endpoints.
+
+    Pass asynchronous=True (see is_asgi) when the response is served by
+    ASGI: the rows are then read with .aiterator() and the content is an
+    async iterator, which ASGI streams; it buffers a sync iterator whole.
+    WSGI needs the sync iterator for the same reason.
+    '''
+    writer = WRITERS[output]()
+    if asynchronous:
+        rows = queryset.aiterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        content = astream(writer, rows, represent)
+    else:
+        rows = queryset.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        content = stream(writer, rows, represent)
+    response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[output])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{output}"'
+    return response
+
+
+def is_asgi(request):
+    # DRF wraps the Django request, which tells the two handlers apart.
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def stream(writer, rows, represent):
+    yield writer.start()
+    for row in rows:
+        yield writer.write(represent(row))
+    yield writer.end()
+
+
+async def astream(writer, rows, represent):
+    yield writer.start()
+    async for row in rows:
+        yield writer.write(represent(row))
+    yield writer.end()
+
+
+class JSONWriter:
+
+    def __init__(self):
+        self.separator = ''
+
+    def start(self):
+        return '{"status":"Success","data":['
+
+    def write(self, row):
+        line = self.separator + json.dumps(row, **JSON_DUMPS_PARAMS)
+        self.separator = ','
+        return line
+
+    def end(self):
+        return ']}'
+
+
+class NDJSONWriter:
+
+    def start(self):
+        return ''
+
+    def write(self, row):
+        return json.dumps(row, **JSON_DUMPS_PARAMS) + '\n'
+
+    def end(self):
+        return ''
+
+
+class _Echo:
+    # csv.writer target that hands back the line instead of buffering it.
+    def write(self, value):
+        return value
+
+
+class CSVWriter:
+    '''
+    One CSV line per row, nested objects flattened into dotted columns
+    (e.g. class_slot.fitness_class.name). The header is taken from the
+    first row.
+    '''
+
+    def __init__(self):
+        self.writer = csv.writer(_Echo())
+        self.header = None
+
+    def start(self):
+        return ''
+
+    def write(self, row):
+        row = flatten(row)
+        header = ''
+        if self.header is None:
+            self.header = list(row)
+            header = self.writer.writerow(self.header)
+        return header + self.writer.writerow([row.get(column) for column in self.header])
+
+    def end(self):
+        return ''
+
+
+WRITERS = {'json': JSONWriter, 'ndjson': NDJSONWriter, 'csv': CSVWriter}
+
+
+def flatten(row, prefix=''):
+    flat = {}
+    for key, value in row.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{prefix}{key}.'))
+        else:
+            flat[f'{prefix}{key}'] = value
+    return flat
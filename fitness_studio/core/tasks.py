@@ -0,0 +1,167 @@
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Task name -> TaskHandler, filled by the @task decorator in each app's
+# tasks module (imported by CoreConfig.ready).
+registry = {}
+
+
+class TaskHandler:
+
+    def __init__(self, func, batch, max_attempts):
+        self.func = func
+        self.batch = batch
+        self.max_attempts = max_attempts
+
+
+def task(name, batch=False, max_attempts=None):
+    '''
+    Register a function as the handler of the `name` tasks.
+
+    Handlers take the task payload. With batch=True the handler gets the
+    payloads of every claimed task of that name in one call instead, so it
+    can load what it needs with one query; if it raises, all of them are
+    retried.
+    '''
+    def register(func):
+        registry[name] = TaskHandler(func, batch, max_attempts or settings.TASK_MAX_ATTEMPTS)
+        return func
+    return register
+
+
+def enqueue(name, payload=None, delay=None):
+    '''
+    Add a task to the queue.
+
+    Call it inside the transaction of the change the task belongs to: the
+    task is only seen by workers once that transaction commits, and is
+    discarded with it on rollback. Payloads must be JSON serializable.
+    '''
+    run_after = timezone.now() + delay if delay else timezone.now()
+    return Task.objects.create(name=name, payload=payload or {}, run_after=run_after)
+
+
+def claim(batch_size, lease=None):
+    '''
+    Mark up to batch_size due tasks as running for this worker and return
+    them, oldest first.
+
+    The claim is one conditional UPDATE, so when several workers race for
+    the same rows each task is claimed by exactly one of them. Running
+    tasks whose lease expired (their worker died) are put back first, or
+    failed for good once they used up their attempts: a task that kills
+    its worker is not retried forever.
+    '''
+    now = timezone.now()
+    lease = timedelta(seconds=lease or settings.TASK_LEASE_SECONDS)
+    expired = Task.objects.filter(status=Task.Status.RUNNING, locked_until__lt=now)
+    for name in expired.values_list('name', flat=True).distinct():
+        max_attempts = registry[name].max_attempts if name in registry else settings.TASK_MAX_ATTEMPTS
+        expired.filter(name=name, attempts__gte=max_attempts).update(
+            status=Task.Status.FAILED, claimed_by='', locked_until=None,
+            last_error=f'Lease expired on each of {max_attempts} attempts',
+        )
+    expired.update(status=Task.Status.PENDING, claimed_by='', locked_until=None)
+    due_ids = list(
+        Task.objects.filter(status=Task.Status.PENDING, run_after__lte=now)
+        .order_by('run_after', 'id').values_list('id', flat=True)[:batch_size]
+    )
+    if not due_ids:
+        return []
+    worker = uuid.uuid4().hex
+    Task.objects.filter(id__in=due_ids, status=Task.Status.PENDING).update(
+        status=Task.Status.RUNNING, claimed_by=worker, locked_until=now + lease, attempts=F('attempts') + 1
+    )
+    return list(Task.objects.filter(id__in=due_ids, claimed_by=worker).order_by('id'))
+
+
+def run_batch(batch_size=None):
+    '''
+    Claim and run one batch of tasks. Returns the number of tasks that
+    succeeded, will be retried and failed for good.
+    '''
+    tasks = claim(batch_size or settings.TASK_BATCH_SIZE)
+    by_name = defaultdict(list)
+    for claimed in tasks:
+        by_name[claimed.name].append(claimed)
+
+    done, failed = [], []
+    for name, group in by_name.items():
+        handler = registry.get(name)
+        if handler is None:
+            fail(group, f'No handler registered for task {name}', max_attempts=0)
+            failed.extend(group)
+        elif handler.batch:
+            error = call(handler, [claimed.payload for claimed in group], name)
+            if error is None:
+                done.extend(group)
+            else:
+                fail(group, error, handler.max_attempts)
+                failed.extend(group)
+        else:
+            for claimed in group:
+                error = call(handler, claimed.payload, name)
+                if error is None:
+                    done.append(claimed)
+                else:
+                    fail([claimed], error, handler.max_attempts)
+                    failed.append(claimed)
+
+    # A task whose lease lapsed while it ran may have been claimed again
+    # by another worker, which now owns it.
+    for worker, ids in owned(done).items():
+        Task.objects.filter(id__in=ids, claimed_by=worker).delete()
+    gave_up = sum(1 for claimed in failed if claimed.status == Task.Status.FAILED)
+    return len(done), len(failed) - gave_up, gave_up
+
+
+def call(handler, payload, name):
+    # Returns None on success, otherwise the error message.
+    try:
+        handler.func(payload)
+    except Exception as e:
+        logger.warning('task failed name=%s error=%s', name, e)
+        return f'{type(e).__name__}: {e}'
+    return None
+
+
+def owned(tasks):
+    # Task ids by the worker that claimed them.
+    ids = defaultdict(list)
+    for claimed in tasks:
+        ids[claimed.claimed_by].append(claimed.id)
+    return ids
+
+
+def fail(tasks, error, max_attempts):
+    '''
+    Schedule a retry with exponential backoff (TASK_RETRY_DELAY seconds,
+    doubled per attempt), or give up after max_attempts attempts. Only
+    tasks still held by the worker that claimed them are updated.
+    '''
+    now = timezone.now()
+    changes = defaultdict(list)
+    for failed in tasks:
+        if failed.attempts >= max_attempts:
+            failed.status = Task.Status.FAILED
+        else:
+            failed.status = Task.Status.PENDING
+            failed.run_after = now + timedelta(seconds=settings.TASK_RETRY_DELAY * 2 ** (failed.attempts - 1))
+        changes[failed.claimed_by, failed.status, failed.run_after].append(failed.id)
+        failed.last_error = error
+        failed.claimed_by = ''
+        failed.locked_until = None
+    for (worker, status, run_after), ids in changes.items():
+        Task.objects.filter(id__in=ids, claimed_by=worker).update(
+            status=status, run_after=run_after, last_error=error, claimed_by='', locked_until=None
+        )
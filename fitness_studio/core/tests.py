@@ -0,0 +1,222 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from class_booking.views import get_booking_details
+from core.seed import create_instructor, create_members
+from fitness_class.views import get_instructor_analytics
+from user.serializers import MyTokenObtainPairSerializer
+from user.models import CustomUser
+from .authentication import StatelessJWTAuthentication, StudioTokenUser
+from .caching import VersionedCache
+from .models import Task
+from .throttling import client_ip, get_buckets
+from .tasks import TaskHandler, claim, enqueue, registry, run_batch
+
+
+class TaskQueueTests(TestCase):
+
+    def test_task_of_a_rolled_back_transaction_is_discarded(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                enqueue('test.noop')
+                raise RuntimeError('rolled back')
+        self.assertFalse(Task.objects.exists())
+
+    def test_claims_never_share_a_task(self):
+        for _ in range(5):
+            enqueue('test.noop')
+        first, second = claim(3), claim(3)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertFalse({task.id for task in first} & {task.id for task in second})
+        self.assertEqual(claim(3), [])
+
+    @override_settings(TASK_RETRY_DELAY=30)
+    def test_failing_task_backs_off_then_fails(self):
+        handler = TaskHandler(mock.Mock(side_effect=ValueError('boom')), batch=False, max_attempts=2)
+        with mock.patch.dict(registry, {'test.fail': handler}), self.assertLogs('core.tasks', 'WARNING'):
+            task = enqueue('test.fail')
+            self.assertEqual(run_batch(), (0, 1, 0))
+            task.refresh_from_db()
+            self.assertEqual(task.status, Task.Status.PENDING)
+            self.assertGreater(task.run_after, timezone.now() + timedelta(seconds=25))
+            self.assertEqual(run_batch(), (0, 0, 0))
+
+            Task.objects.update(run_after=timezone.now())
+            self.assertEqual(run_batch(), (0, 0, 1))
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.Status.FAILED)
+        self.assertEqual(task.attempts, 2)
+        self.assertIn('boom', task.last_error)
+
+    def test_expired_lease_without_attempts_left_fails(self):
+        expired = timezone.now() - timedelta(seconds=1)
+        retried = enqueue('test.noop')
+        exhausted = enqueue('test.noop')
+        Task.objects.filter(id=retried.id).update(status=Task.Status.RUNNING, attempts=1, locked_until=expired)
+        Task.objects.filter(id=exhausted.id).update(status=Task.Status.RUNNING, attempts=5, locked_until=expired)
+        with override_settings(TASK_MAX_ATTEMPTS=5):
+            self.assertEqual([task.id for task in claim(10)], [retried.id])
+        exhausted.refresh_from_db()
+        self.assertEqual(exhausted.status, Task.Status.FAILED)
+
+    def test_worker_that_lost_its_lease_leaves_the_task_alone(self):
+        enqueue('test.noop')
+        stale, = claim(1)
+        Task.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        current, = claim(1)
+        handler = TaskHandler(mock.Mock(), batch=False, max_attempts=5)
+        with mock.patch.dict(registry, {'test.noop': handler}), mock.patch('core.tasks.claim', return_value=[stale]):
+            run_batch()
+        current.refresh_from_db()
+        self.assertEqual(current.status, Task.Status.RUNNING)
+        self.assertEqual(current.attempts, 2)
+
+
+class TaskClaimRaceTests(TransactionTestCase):
+
+    def test_concurrent_claims_never_share_a_task(self):
+        for _ in range(200):
+            enqueue('test.noop')
+        claimed = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(8)
+
+        def worker(_):
+            try:
+                barrier.wait()
+                while tasks := claim(7):
+                    with lock:
+                        claimed.extend(task.id for task in tasks)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(worker, range(8)))
+        self.assertEqual(len(claimed), 200)
+        self.assertEqual(len(set(claimed)), 200)
+
+
+class ThrottleTests(TestCase):
+
+    def setUp(self):
+        # Fresh buckets for every test.
+        get_buckets.cache_clear()
+        self.addCleanup(get_buckets.cache_clear)
+        self.client = APIClient()
+
+    def book(self, user=None, **extra):
+        # Slot 0 does not exist: an allowed request gets a 404 from the view.
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'} if user else {}
+        return self.client.post('/booking/0/book', **headers, **extra)
+
+    def member(self):
+        return CustomUser.objects.get(id=create_members(1)[0])
+
+    def test_eleventh_booking_in_a_minute_is_throttled_without_queries(self):
+        member = self.member()
+        for _ in range(10):
+            self.assertNotEqual(self.book(member).status_code, 429)
+        with self.assertNumQueries(0):
+            response = self.book(member)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    @override_settings(THROTTLE_RATES={'book_slot': '2/min'})
+    def test_buckets_are_per_user(self):
+        first, second = self.member(), self.member()
+        for _ in range(2):
+            self.book(first)
+        self.assertEqual(self.book(first).status_code, 429)
+        self.assertNotEqual(self.book(second).status_code, 429)
+
+    @override_settings(THROTTLE_RATES={'book_slot': '2/min'})
+    def test_buckets_are_per_ip_without_a_token(self):
+        for _ in range(2):
+            self.book(REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(self.book(REMOTE_ADDR='10.0.0.1').status_code, 429)
+        self.assertNotEqual(self.book(REMOTE_ADDR='10.0.0.2').status_code, 429)
+
+    @override_settings(THROTTLE_RATES={'book_slot': '2/min'}, THROTTLE_PROXY_COUNT=0)
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        for i in range(2):
+            self.book(REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=f'203.0.113.{i}')
+        response = self.book(REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.9')
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(THROTTLE_RATES={'book_slot': '2/min'}, THROTTLE_PROXY_COUNT=1)
+    def test_forwarded_for_is_used_behind_a_proxy(self):
+        for _ in range(2):
+            self.book(REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.1')
+        self.assertEqual(self.book(REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.1').status_code, 429)
+        self.assertNotEqual(self.book(REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.2').status_code, 429)
+
+    def test_client_ip_takes_the_address_the_outermost_proxy_saw(self):
+        request = mock.Mock(META={'REMOTE_ADDR': '10.0.0.2', 'HTTP_X_FORWARDED_FOR': '1.2.3.4, 203.0.113.1, 10.0.0.1'})
+        with override_settings(THROTTLE_PROXY_COUNT=0):
+            self.assertEqual(client_ip(request), '10.0.0.2')
+        with override_settings(THROTTLE_PROXY_COUNT=2):
+            self.assertEqual(client_ip(request), '203.0.113.1')
+
+
+class StatelessAuthenticationTests(TestCase):
+    '''
+    What JWT_STATELESS_AUTH=1 installs as the default authentication class,
+    patched onto the views here as DRF reads the setting at import time.
+    '''
+
+    def get(self, view, user, url):
+        client = APIClient()
+        token = MyTokenObtainPairSerializer.get_token(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with mock.patch.object(view.cls, 'authentication_classes', [StatelessJWTAuthentication]):
+            return client.get(url)
+
+    def assert_no_user_queries(self, view, user, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(view, user, url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query['sql'] for query in queries if 'FROM "user_customuser"' in query['sql']])
+
+    def test_is_user_view_loads_no_user(self):
+        self.assert_no_user_queries(get_booking_details, CustomUser.objects.get(id=create_members(1)[0]), '/booking/')
+
+    def test_is_instructor_view_loads_no_user(self):
+        self.assert_no_user_queries(get_instructor_analytics, create_instructor(), '/class/analytics')
+
+    def test_role_is_checked_from_the_token(self):
+        response = self.get(get_instructor_analytics, CustomUser.objects.get(id=create_members(1)[0]), '/class/analytics')
+        self.assertEqual(response.status_code, 403)
+
+    def test_deleted_user_has_no_extra_attributes(self):
+        user = CustomUser.objects.get(id=create_members(1)[0])
+        token_user = StudioTokenUser(MyTokenObtainPairSerializer.get_token(user).access_token)
+        user.delete()
+        self.assertEqual(token_user.role, 'user')
+        self.assertFalse(hasattr(token_user, 'email'))
+
+
+class VersionedCacheTests(TestCase):
+
+    def test_stats_count_every_lookup_across_threads(self):
+        cache = VersionedCache('test_stats')
+        key = cache.make_key('listing')
+        cache.set(key, 'payload')
+
+        def lookup(_):
+            for _ in range(2000):
+                cache.get(key)
+                cache.get(key + ':missing')
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lookup, range(8)))
+        self.assertEqual(cache.stats(), {'hits': 16000, 'misses': 16000, 'hit_ratio': 0.5})
@@ -0,0 +1,131 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    '''
+    '10/min' -> (10, 60): a bucket of 10 tokens refilled over 60 seconds.
+    The period is read from its first letter (s, m, h or d).
+    '''
+    count, period = rate.split('/')
+    return int(count), PERIODS[period.strip()[0]]
+
+
+class LocalBuckets:
+    '''
+    Token buckets in the memory of the process, for a single process or
+    limits per process. The least recently used buckets are dropped past
+    maxsize; a dropped bucket starts full again, as an idle one would be.
+    '''
+
+    def __init__(self, maxsize=100_000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, period):
+        '''
+        Take a token from the bucket. Returns 0 if one was left, otherwise
+        the seconds until the next token.
+        '''
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * capacity / period)
+            wait = 0 if tokens >= 1 else (1 - tokens) * period / capacity
+            self._buckets[key] = (tokens - 1 if not wait else tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class CacheBuckets:
+    '''
+    Token buckets in a Django cache (THROTTLE_CACHE), shared by every
+    process using it, e.g. Redis or Memcached. One get and one set per
+    check: clients racing on the same bucket can get a token or two more
+    than the rate, which is fine for shedding abusive load. The cache must
+    hold every active bucket: an evicted bucket starts full again.
+    '''
+
+    def __init__(self):
+        self.cache = caches[settings.THROTTLE_CACHE]
+
+    def consume(self, key, capacity, period):
+        now = time.time()
+        tokens, updated = self.cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + max(now - updated, 0) * capacity / period)
+        wait = 0 if tokens >= 1 else (1 - tokens) * period / capacity
+        # An untouched bucket is full again after one period.
+        self.cache.set(key, (tokens - 1 if not wait else tokens, now), period)
+        return wait
+
+
+@lru_cache(maxsize=None)
+def get_buckets(path=None):
+    '''
+    The configured THROTTLE_BACKEND (or the backend at `path`), created
+    once per process.
+    '''
+    return import_string(path or settings.THROTTLE_BACKEND)()
+
+
+_authenticator = JWTAuthentication()
+
+
+def client_ident(request):
+    '''
+    'user:<id>' for a request with a valid access token, 'ip:<address>'
+    otherwise. The token is only verified (signature and expiry), the user
+    is not loaded.
+    '''
+    header = _authenticator.get_header(request)
+    raw_token = _authenticator.get_raw_token(header) if header is not None else None
+    if raw_token is not None:
+        try:
+            return f'user:{_authenticator.get_validated_token(raw_token)[api_settings.USER_ID_CLAIM]}'
+        except (InvalidToken, TokenError, KeyError):
+            pass
+    return f'ip:{client_ip(request)}'
+
+
+def client_ip(request):
+    # Behind THROTTLE_PROXY_COUNT proxies the client address is the one
+    # the outermost proxy appended to X-Forwarded-For.
+    proxies = settings.THROTTLE_PROXY_COUNT
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(',')]
+        return addresses[-min(proxies, len(addresses))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def check_throttle(request, url_name):
+    '''
+    Take a token from the client's bucket of the URL name, if
+    THROTTLE_RATES has a rate for it. Returns 0 when the request may go
+    ahead, otherwise the seconds until it may be retried.
+    '''
+    rate = settings.THROTTLE_RATES.get(url_name)
+    if not rate:
+        return 0
+    capacity, period = parse_rate(rate)
+    return get_buckets().consume(f'throttle:{url_name}:{client_ident(request)}', capacity, period)
+
+
+def retry_after(wait):
+    return str(max(1, math.ceil(wait)))
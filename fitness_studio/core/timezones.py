@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+
+# Class dates and slot times are stored in the studio's local time
+# (STUDIO_TIME_ZONE); ClassSlot.start_at/end_at hold the same instants in UTC.
+STUDIO_TIMEZONE = ZoneInfo(settings.STUDIO_TIME_ZONE)
+
+
+def studio_now():
+    return datetime.now(STUDIO_TIMEZONE)
+
+
+def studio_today():
+    return studio_now().date()
+
+
+def studio_datetime(date, time):
+    '''
+    Aware UTC datetime of a studio-local date and time.
+    '''
+    return datetime.combine(date, time, tzinfo=STUDIO_TIMEZONE).astimezone(timezone.utc)
+
+
+@lru_cache(maxsize=128)
+def get_timezone(name):
+    '''
+    Resolve a timezone name to a ZoneInfo, or None if it is empty or unknown.
+    '''
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=4096)
+def convert_from_studio(date, time, zone):
+    '''
+    Convert a studio-local (date, time) to a (date, time) pair in `zone`.
+
+    Listings repeat the same few class dates and slot times on every row,
+    so the conversions are memoized in a bounded LRU keyed by
+    (date, time, zone).
+    '''
+    converted = datetime.combine(date, time, tzinfo=STUDIO_TIMEZONE).astimezone(zone)
+    return converted.date(), converted.time()
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+       path('stats', views.profiling_stats, name='profiling_stats'),
+]
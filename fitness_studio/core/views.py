@@ -0,0 +1,42 @@
+from django.conf import settings
+from rest_framework.response import Response
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework import status
+
+from . import profiling
+from .permissions import IsInstructor
+from fitness_class.cache import available_classes_cache
+
+# Create your views here.
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsInstructor])
+def profiling_stats(request):
+    '''
+    Get the request profiling stats of this server process.
+
+    The user must include their access token in the request 
+    headers to authenticate the request. Only available when 
+    PROFILING_STATS_ENABLED is set.
+
+    HTTP Method:
+        GET: Returns the stats.
+        DELETE: Resets the stats.
+
+    Responses:
+        - Success: Returns a status of "Success" along with, per URL name, the 
+          request count, p50/p95/p99 wall time, and the average DB time, query 
+          count and serializer time, plus the available classes cache hits 
+          and misses.
+        - Error: If profiling stats are disabled, returns a status of "Error" 
+          along with the message.
+    '''
+    if not getattr(settings, 'PROFILING_STATS_ENABLED', False):
+        return Response({"status":"Error", "message":"Profiling stats are disabled"}, status=status.HTTP_404_NOT_FOUND)
+    if request.method == 'DELETE':
+        profiling.stats.reset()
+        return Response({"status":"Success", "message":"Profiling stats reset"}, status=status.HTTP_200_OK)
+    data = {
+        "views": profiling.stats.summary(),
+        "caches": {"available_classes": available_classes_cache.stats()},
+    }
+    return Response({"status":"Success", "data":data}, status=status.HTTP_200_OK)
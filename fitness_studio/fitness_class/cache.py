@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.db import transaction
+
+from core.caching import VersionedCache
+
+# Responses of get_available_classes, keyed by timezone and listing params.
+# Anything that changes availability must call invalidate_available_classes().
+available_classes_cache = VersionedCache(
+    'available_classes', timeout=getattr(settings, 'AVAILABLE_CLASSES_CACHE_TIMEOUT', 30)
+)
+
+
+def invalidate_available_classes():
+    '''
+    Bump the cache version once the current transaction commits.
+    '''
+    transaction.on_commit(available_classes_cache.bump)
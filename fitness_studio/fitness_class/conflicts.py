@@ -0,0 +1,99 @@
+import heapq
+from itertools import count
+
+from .models import ClassSlot
+
+
+def find_overlaps(intervals):
+    '''
+    Sorted sweep over (date, start, end, item) intervals.
+
+    Intervals are sorted by date and start, and the ones still running are
+    kept in a heap ordered by end time, so each interval is only compared
+    with the intervals it actually overlaps. Intervals that merely touch
+    (one ends when the next starts) do not overlap.
+
+    Yields (earlier item, later item) for every overlapping pair.
+    '''
+    running = []
+    current_date = None
+    tiebreak = count()
+    for day, start, end, item in sorted(intervals, key=lambda interval: interval[:3]):
+        if day != current_date:
+            running = []
+            current_date = day
+        while running and running[0][0] <= start:
+            heapq.heappop(running)
+        for _end, _order, other in running:
+            yield other, item
+        heapq.heappush(running, (end, next(tiebreak), item))
+
+
+def interval(day, start, end, slot_id=None, class_id=None, name=None):
+    item = {
+        'slot_id': slot_id, 'class_id': class_id, 'name': name,
+        'date': day.isoformat(), 'start_time': start.isoformat(), 'end_time': end.isoformat(),
+    }
+    return day, start, end, item
+
+
+def existing_intervals(instructor_id, **date_filter):
+    '''
+    Intervals of the instructor's slots, read through the (instructor, date)
+    index. date_filter narrows the dates, e.g. date__in=[...] or
+    date__gte=today.
+    '''
+    slots = ClassSlot.objects.filter(
+        fitness_class__instructor_id=instructor_id,
+        **{f'fitness_class__{lookup}': value for lookup, value in date_filter.items()}
+    ).values_list('id', 'fitness_class_id', 'fitness_class__name', 'fitness_class__date', 'start_time', 'end_time')
+    return [
+        interval(day, start, end, slot_id, class_id, name)
+        for slot_id, class_id, name, day, start, end in slots
+    ]
+
+
+def find_conflicts(instructor_id, classes):
+    '''
+    Conflicts of new classes with each other and with the instructor's
+    existing slots.
+
+    classes is a list of {'name', 'date', 'slots': [{'start', 'end'}]}.
+    Only the instructor's slots on the dates of the new classes are read,
+    with one query. New slots have no slot_id; overlaps between two
+    existing slots are not reported.
+    '''
+    proposed = [
+        interval(fitness_class['date'], slot['start'], slot['end'], name=fitness_class.get('name'))
+        for fitness_class in classes
+        for slot in fitness_class['slots']
+    ]
+    if not proposed:
+        return []
+    dates = {day for day, _start, _end, _item in proposed}
+    intervals = proposed + existing_intervals(instructor_id, date__in=dates)
+    conflicts = []
+    for first, second in find_overlaps(intervals):
+        if second['slot_id'] is None:
+            conflicts.append({'slot': second, 'conflicts_with': first})
+        elif first['slot_id'] is None:
+            conflicts.append({'slot': first, 'conflicts_with': second})
+    return conflicts
+
+
+def find_schedule_conflicts(instructor_id, date_from):
+    '''
+    Overlapping slots in the instructor's existing schedule from date_from on.
+    '''
+    return [
+        {'slot': first, 'conflicts_with': second}
+        for first, second in find_overlaps(existing_intervals(instructor_id, date__gte=date_from))
+    ]
+
+
+def describe_conflict(conflict):
+    slot, other = conflict['slot'], conflict['conflicts_with']
+    return (
+        f"{slot['name'] or 'New class'} {slot['start_time'][:5]}-{slot['end_time'][:5]} overlaps "
+        f"{other['name'] or 'new class'} {other['start_time'][:5]}-{other['end_time'][:5]} on {slot['date']}."
+    )
@@ -0,0 +1,12 @@
+class ScheduleError(Exception):
+    '''
+    Base class for schedule changes that should be reported to the user.
+    '''
+    message = 'This schedule cannot be changed'
+
+    def __init__(self, message=None):
+        super().__init__(message or self.message)
+
+
+class OccurrenceBookedError(ScheduleError):
+    message = 'This occurrence already has bookings'
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from class_booking.models import ClassBooking
+from core.benchmark import benchmark_database, format_timings, measure
+from core.seed import create_bookings, create_instructor, create_members, create_slots
+from core.timezones import studio_now, studio_today
+from fitness_class.models import ClassSlot
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the available classes query while the booking history grows. '
+        'Runs against a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--history', default='1000,10000,100000',
+            help='Comma separated booking history sizes to measure at (default: 1000,10000,100000).'
+        )
+        parser.add_argument('--upcoming-slots', type=int, default=200, help='Number of open future slots.')
+        parser.add_argument('--members', type=int, default=1000, help='Number of member accounts.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per history size.')
+
+    def handle(self, *args, **options):
+        levels = sorted(int(level) for level in options['history'].split(','))
+        with benchmark_database():
+            self.seed(options['upcoming_slots'], options['members'])
+            now = studio_now()
+            for level in levels:
+                self.grow_history(level)
+                timings = measure(lambda: list(ClassSlot.objects.available(now)), options['repeat'])
+                self.stdout.write(format_timings(f'{level} bookings', timings))
+
+    def seed(self, upcoming_slots, members):
+        self.instructor = create_instructor()
+        self.member_ids = create_members(members)
+        future_date = studio_today() + timedelta(days=1)
+        create_slots(self.instructor, [future_date] * -(-upcoming_slots // 10), per_class=10)
+        self.past_date = future_date - timedelta(days=30)
+
+    def grow_history(self, level):
+        # Past slots, ten per day, each fully booked by distinct members.
+        missing = level - ClassBooking.objects.count()
+        if missing <= 0:
+            return
+        days = -(-missing // (len(self.member_ids) * 10))
+        dates = [self.past_date - timedelta(days=day) for day in range(days)]
+        self.past_date -= timedelta(days=days)
+        create_bookings(create_slots(self.instructor, dates, per_class=10), self.member_ids, missing)
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.db.models.functions import TruncWeek
+
+from class_booking.models import ClassBooking
+from core.benchmark import benchmark_database, format_timings, measure
+from core.seed import create_bookings, create_instructor, create_members, create_slots
+from core.timezones import studio_today
+from fitness_class.occupancy import instructor_occupancy, rebuild_occupancy, week_start
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the instructor analytics as bookings grow: the rollup backed report next to '
+        'an ad hoc GROUP BY over the bookings of the same weeks. Runs against a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bookings', default='1000,10000,100000',
+            help='Comma separated booking counts to measure at (default: 1000,10000,100000).'
+        )
+        parser.add_argument('--members', type=int, default=1000, help='Number of member accounts.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per booking count.')
+
+    def handle(self, *args, **options):
+        levels = sorted(int(level) for level in options['bookings'].split(','))
+        with benchmark_database():
+            self.seed(options['members'])
+            for level in levels:
+                self.grow(level)
+                timings = measure(rebuild_occupancy, 1)
+                self.stdout.write(f'{level} bookings')
+                self.stdout.write(format_timings('  rebuild rollup', timings))
+                for label, report in (
+                    ('rollup report', lambda: instructor_occupancy(self.instructor.id, self.first_week, self.last_week)),
+                    ('ad hoc group by', self.ad_hoc),
+                ):
+                    self.stdout.write(format_timings(f'  {label}', measure(report, options['repeat'])))
+
+    def seed(self, members, weeks=8, per_day=10):
+        # Eight weeks of ten slots a day, each big enough for every member.
+        self.instructor = create_instructor()
+        self.member_ids = create_members(members)
+        self.first_week = week_start(studio_today()) - timedelta(weeks=3)
+        self.last_week = self.first_week + timedelta(weeks=weeks - 1)
+        self.slots = create_slots(
+            self.instructor, [self.first_week + timedelta(days=day) for day in range(weeks * 7)],
+            per_class=per_day, class_types=('yoga', 'zumba', 'hiit'), member_max_count=members,
+        )
+
+    def grow(self, level):
+        # Slots are filled in turn by distinct members, spreading the
+        # bookings over the weeks.
+        create_bookings(self.slots, self.member_ids, level - ClassBooking.objects.count())
+
+    def ad_hoc(self):
+        return list(ClassBooking.objects.filter(
+            class_slot__fitness_class__instructor_id=self.instructor.id,
+            class_slot__fitness_class__date__range=(self.first_week, self.last_week + timedelta(days=6)),
+        ).annotate(
+            week=TruncWeek('class_slot__fitness_class__date'),
+        ).values('week', 'class_slot__fitness_class__class_type').annotate(booked=Count('id')).order_by())
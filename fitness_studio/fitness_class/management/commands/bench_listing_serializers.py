@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from class_booking.serializers import ClassBookingSerializer, booking_representation
+from core.benchmark import format_timings, measure
+from core.seed import build_bookings, build_slots
+from core.timezones import get_timezone
+from fitness_class.serializers import ClassSlotSerializer, slot_representation
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the ModelSerializer path with the fast read-only representations '
+        'used by the listing endpoints, and check that both render identical JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='1000,10000,100000', help='Comma separated listing sizes.')
+        parser.add_argument('--timezone', default=None, help='Target timezone (default: the studio timezone, no conversion).')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case.')
+
+    def handle(self, *args, **options):
+        zone = get_timezone(options['timezone'])
+        renderer = JSONRenderer()
+
+        for rows in (int(rows) for rows in options['rows'].split(',')):
+            slots = build_slots(rows)
+            bookings = build_bookings(rows)
+            cases = {
+                'slots': (
+                    lambda: ClassSlotSerializer(slots, many=True, target_timezone=zone).data,
+                    lambda: [slot_representation(slot, zone) for slot in slots],
+                ),
+                'bookings': (
+                    lambda: ClassBookingSerializer(bookings, many=True, target_timezone=zone).data,
+                    lambda: [booking_representation(booking, zone) for booking in bookings],
+                ),
+            }
+            for name, (model_serializer, fast) in cases.items():
+                if renderer.render(model_serializer()) != renderer.render(fast()):
+                    raise CommandError(f'Fast {name} representation does not match the ModelSerializer output.')
+                self.stdout.write(format_timings(f'{rows} {name} drf', measure(model_serializer, options['repeat'])))
+                self.stdout.write(format_timings(f'{rows} {name} fast', measure(fast, options['repeat'])))
@@ -0,0 +1,65 @@
+from datetime import date, time, timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.benchmark import benchmark_database, format_timings, measure
+from core.seed import create_instructor, create_slots
+from fitness_class.conflicts import find_conflicts, find_schedule_conflicts
+from fitness_class.models import ClassSlot
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark instructor conflict detection as the instructor schedule grows: checking a '
+        'new class (the create_class validation), a month of new classes and auditing the whole '
+        'schedule, next to a naive scan of every slot. Runs against a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--slots', default='1000,10000,50000',
+            help='Comma separated schedule sizes to measure at (default: 1000,10000,50000).'
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per size.')
+
+    def handle(self, *args, **options):
+        levels = sorted(int(level) for level in options['slots'].split(','))
+        with benchmark_database():
+            instructor = create_instructor()
+            # Other instructors teach at the same times and must not be read.
+            other = create_instructor()
+            self.first_date = date(2030, 1, 1)
+            self.days = 0
+            for level in levels:
+                self.grow(instructor, level)
+                self.grow(other, level)
+                new_class = [{'name': 'New', 'date': self.first_date + timedelta(days=self.days // 2),
+                              'slots': [{'start': time(6, 30), 'end': time(7, 30)}]}]
+                month = [{'name': f'New {i}', 'date': self.first_date + timedelta(days=i),
+                          'slots': [{'start': time(20), 'end': time(21)}]} for i in range(30)]
+                self.stdout.write(f'{level} slots')
+                for label, check in (
+                    ('check one class', lambda: find_conflicts(instructor.id, new_class)),
+                    ('check 30 classes', lambda: find_conflicts(instructor.id, month)),
+                    ('audit schedule', lambda: find_schedule_conflicts(instructor.id, self.first_date)),
+                    ('naive scan', lambda: self.naive(instructor.id, new_class)),
+                ):
+                    self.stdout.write(format_timings(f'  {label}', measure(check, options['repeat'])))
+
+    def grow(self, instructor, level, per_day=10):
+        existing = ClassSlot.objects.filter(fitness_class__instructor=instructor).count()
+        days = range(existing // per_day, -(-level // per_day))
+        create_slots(instructor, [self.first_date + timedelta(days=day) for day in days], per_class=per_day)
+        self.days = max(self.days, days.stop)
+
+    def naive(self, instructor_id, classes):
+        # Every slot of the instructor against every new slot.
+        slots = ClassSlot.objects.filter(fitness_class__instructor_id=instructor_id).select_related('fitness_class')
+        return [
+            slot.id
+            for slot in slots
+            for fitness_class in classes
+            for new in fitness_class['slots']
+            if slot.fitness_class.date == fitness_class['date']
+            and slot.start_time < new['end'] and new['start'] < slot.end_time
+        ]
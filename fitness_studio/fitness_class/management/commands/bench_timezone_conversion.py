@@ -0,0 +1,41 @@
+from datetime import datetime
+
+import pytz
+from django.core.management.base import BaseCommand
+
+from core.benchmark import format_timings, measure
+from core.seed import build_slots
+from core.timezones import convert_from_studio, get_timezone
+from fitness_class.serializers import ClassSlotSerializer
+
+
+def pytz_convert(class_date, start_time, target_timezone):
+    # Per-row conversion as ClassSlotSerializer used to do it, for comparison.
+    target_tz = pytz.timezone(target_timezone)
+    kolkata_tz = pytz.timezone('Asia/Kolkata')
+    converted = kolkata_tz.localize(datetime.combine(class_date, start_time)).astimezone(target_tz)
+    return converted.date(), converted.time()
+
+
+class Command(BaseCommand):
+    help = 'Microbenchmark slot timezone conversion and ClassSlotSerializer with and without a target timezone.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Slots per listing.')
+        parser.add_argument('--timezone', default='America/New_York', help='Target timezone.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case.')
+
+    def handle(self, *args, **options):
+        slots = build_slots(options['rows'])
+        rows = [(slot.fitness_class.date, slot.start_time) for slot in slots]
+        zone = get_timezone(options['timezone'])
+
+        cases = [
+            ('pytz per row', lambda: [pytz_convert(d, t, options['timezone']) for d, t in rows]),
+            ('cached zoneinfo', lambda: [convert_from_studio(d, t, zone) for d, t in rows]),
+            ('serializer IST', lambda: ClassSlotSerializer(slots, many=True).data),
+            ('serializer shifted', lambda: ClassSlotSerializer(slots, many=True, target_timezone=zone).data),
+        ]
+        self.stdout.write(f'{len(slots)} slots, target timezone {options["timezone"]}')
+        for label, func in cases:
+            self.stdout.write(format_timings(label, measure(func, options['repeat'])))
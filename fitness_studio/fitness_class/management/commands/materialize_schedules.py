@@ -0,0 +1,34 @@
+import time as timer
+
+from django.core.management.base import BaseCommand
+
+from fitness_class.schedules import horizon_end, materialize_due_schedules
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the classes and slots of recurring schedules up to SCHEDULE_HORIZON_DAYS ahead. '
+        'Run it daily; schedules that are already materialized far enough are skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Due schedules fetched per query.')
+
+    def handle(self, *args, **options):
+        until = horizon_end()
+        schedules = created = failed = 0
+        start = timer.perf_counter()
+        for schedule_id, count, error in materialize_due_schedules(until, options['batch_size']):
+            schedules += 1
+            created += count
+            if error is not None:
+                failed += 1
+                self.stderr.write(f'Schedule {schedule_id}: {error}')
+        elapsed = timer.perf_counter() - start
+        self.stdout.write(
+            f'{created} class(es) created for {schedules} schedule(s) up to {until} in {elapsed:.2f} s'
+        )
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} schedule(s) failed.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Schedules materialized.'))
@@ -0,0 +1,22 @@
+import time as timer
+
+from django.core.management.base import BaseCommand
+
+from fitness_class.occupancy import rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the weekly occupancy rollup of the instructor analytics from the class slots. '
+        'Cancellation counts are kept, as they are only recorded in the rollup.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--instructor', type=int, help='Only rebuild the rows of this instructor id.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per query.')
+
+    def handle(self, *args, **options):
+        start = timer.perf_counter()
+        written = rebuild_occupancy(options['instructor'], options['batch_size'])
+        elapsed = timer.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'{written} weekly row(s) rebuilt in {elapsed:.2f} s.'))
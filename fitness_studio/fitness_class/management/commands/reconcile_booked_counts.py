@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F
+
+from fitness_class.models import ClassSlot
+
+
+class Command(BaseCommand):
+    help = 'Compare ClassSlot.booked_count with the actual ClassBooking rows and fix any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Slots updated per query.')
+
+    def handle(self, *args, **options):
+        drifted = ClassSlot.objects.annotate(
+            actual_count=Count('class_slot'),
+        ).exclude(
+            booked_count=F('actual_count'),
+        ).only('id', 'booked_count').order_by('id')
+
+        batch = []
+        fixed = 0
+        for slot in drifted.iterator(chunk_size=options['batch_size']):
+            self.stdout.write(f'Slot {slot.id}: booked_count={slot.booked_count}, actual={slot.actual_count}')
+            slot.booked_count = slot.actual_count
+            batch.append(slot)
+            if len(batch) >= options['batch_size']:
+                fixed += self.save(batch, options['dry_run'])
+                batch = []
+        fixed += self.save(batch, options['dry_run'])
+
+        if options['dry_run']:
+            self.stdout.write(f'{fixed} slot(s) out of sync.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{fixed} slot(s) reconciled.'))
+
+    def save(self, batch, dry_run):
+        if batch and not dry_run:
+            ClassSlot.objects.bulk_update(batch, ['booked_count'])
+        return len(batch)
@@ -0,0 +1,68 @@
+from django.db import models
+from django.db.models import F, Q
+
+
+class ClassSlotQuerySet(models.QuerySet):
+
+    def upcoming(self, now):
+        '''
+        Slots that have not started yet, as of an aware datetime.
+        '''
+        return self.filter(start_at__gt=now)
+
+    def starting_by(self, moment):
+        '''
+        Slots that start no later than an aware datetime.
+        '''
+        return self.filter(start_at__lte=moment)
+
+    def available(self, now):
+        '''
+        Upcoming slots that still have seats left.
+
+        Occupancy is read from the denormalized `booked_count` column, so no
+        booking rows are aggregated to build the listing.
+        '''
+        return self.upcoming(now).filter(
+            booked_count__lt=F('fitness_class__member_max_count'),
+        ).select_related(
+            'fitness_class__instructor',
+        ).order_by('start_at', 'id')
+
+    def filter_listing(self, class_type=None, instructor=None, date_from=None, date_to=None, min_seats=None):
+        '''
+        Apply the optional listing filters of the available classes endpoint.
+        '''
+        queryset = self
+        if class_type:
+            queryset = queryset.filter(fitness_class__class_type=class_type)
+        if instructor:
+            queryset = queryset.filter(fitness_class__instructor_id=instructor)
+        if date_from:
+            queryset = queryset.filter(fitness_class__date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(fitness_class__date__lte=date_to)
+        if min_seats:
+            queryset = queryset.filter(booked_count__lte=F('fitness_class__member_max_count') - min_seats)
+        return queryset
+
+    def after(self, start_at, slot_id):
+        '''
+        Keyset pagination: slots that sort after (start_at, id).
+        '''
+        return self.filter(Q(start_at__gt=start_at) | Q(start_at=start_at, id__gt=slot_id))
+
+
+class ClassScheduleQuerySet(models.QuerySet):
+
+    def due(self, until):
+        '''
+        Schedules whose occurrences are not yet materialized up to `until`,
+        leaving out schedules that ended before their materialized window.
+        '''
+        return self.filter(
+            Q(materialized_until__isnull=True) | Q(materialized_until__lt=until)
+        ).filter(
+            Q(end_date__isnull=True) | Q(materialized_until__isnull=True) |
+            Q(end_date__gt=F('materialized_until'))
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-18 07:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness_class', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='fitnessclass',
+            name='date',
+            field=models.DateField(db_index=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.2 on 2026-10-18 07:54
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_booked_count(apps, schema_editor):
+    ClassSlot = apps.get_model('fitness_class', 'ClassSlot')
+    ClassBooking = apps.get_model('class_booking', 'ClassBooking')
+    booking_counts = ClassBooking.objects.filter(
+        class_slot=OuterRef('pk')
+    ).order_by().values('class_slot').annotate(total=Count('id')).values('total')
+    ClassSlot.objects.update(booked_count=Coalesce(Subquery(booking_counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness_class', '0002_fitness_class_date_index'),
+        ('class_booking', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classslot',
+            name='booked_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_booked_count, migrations.RunPython.noop),
+    ]
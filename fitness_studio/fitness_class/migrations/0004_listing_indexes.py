@@ -0,0 +1,28 @@
+# Generated by Django 5.2.2 on 2026-10-18 07:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness_class', '0003_class_slot_booked_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='fitnessclass',
+            name='date',
+            field=models.DateField(),
+        ),
+        migrations.AddIndex(
+            model_name='classslot',
+            index=models.Index(fields=['fitness_class', 'start_time'], name='class_slot_class_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fitnessclass',
+            index=models.Index(fields=['date', 'class_type'], name='fitness_class_date_type_idx'),
+        ),
+    ]
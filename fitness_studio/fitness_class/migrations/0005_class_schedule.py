@@ -0,0 +1,61 @@
+# Generated by Django 5.2.2 on 2026-10-18 08:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness_class', '0004_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ClassSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=80, unique=True)),
+                ('class_type', models.CharField(choices=[('yoga', 'Yoga'), ('zumba', 'Zumba'), ('hiit', 'Hiit')], max_length=10)),
+                ('member_max_count', models.PositiveIntegerField(default=50)),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly')], max_length=10)),
+                ('weekdays', models.PositiveSmallIntegerField(default=0)),
+                ('slots', models.JSONField()),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('materialized_until', models.DateField(blank=True, null=True)),
+                ('instructor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='class_schedules', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='fitnessclass',
+            name='schedule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='fitness_classes', to='fitness_class.classschedule'),
+        ),
+        migrations.AddConstraint(
+            model_name='fitnessclass',
+            constraint=models.UniqueConstraint(fields=('schedule', 'date'), name='fitness_class_schedule_date_uniq'),
+        ),
+        migrations.AddField(
+            model_name='scheduleexception',
+            name='schedule',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exceptions', to='fitness_class.classschedule'),
+        ),
+        migrations.AddIndex(
+            model_name='classschedule',
+            index=models.Index(fields=['materialized_until'], name='class_schedule_horizon_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='scheduleexception',
+            constraint=models.UniqueConstraint(fields=('schedule', 'date'), name='schedule_exception_date_uniq'),
+        ),
+    ]
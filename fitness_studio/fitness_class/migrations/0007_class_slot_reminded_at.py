@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-18 08:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness_class', '0006_instructor_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classslot',
+            name='reminded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
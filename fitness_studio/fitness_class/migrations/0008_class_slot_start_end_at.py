@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_start_end_at(apps, schema_editor):
+    # Existing dates and times are in the studio timezone.
+    ClassSlot = apps.get_model('fitness_class', 'ClassSlot')
+    studio_timezone = ZoneInfo(settings.STUDIO_TIME_ZONE)
+
+    def to_utc(date, time):
+        return datetime.combine(date, time, tzinfo=studio_timezone).astimezone(timezone.utc)
+
+    batch = []
+    slots = ClassSlot.objects.select_related('fitness_class').only(
+        'id', 'start_time', 'end_time', 'fitness_class__date'
+    ).order_by('id')
+    for slot in slots.iterator(chunk_size=2000):
+        slot.start_at = to_utc(slot.fitness_class.date, slot.start_time)
+        slot.end_at = to_utc(slot.fitness_class.date, slot.end_time)
+        batch.append(slot)
+        if len(batch) >= 2000:
+            ClassSlot.objects.bulk_update(batch, ['start_at', 'end_at'])
+            batch = []
+    ClassSlot.objects.bulk_update(batch, ['start_at', 'end_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness_class', '0007_class_slot_reminded_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classslot',
+            name='start_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='classslot',
+            name='end_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(populate_start_end_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='classslot',
+            name='start_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.AlterField(
+            model_name='classslot',
+            name='end_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='classslot',
+            index=models.Index(fields=['start_at', 'id'], name='class_slot_start_at_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.2 on 2026-10-18 08:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncWeek
+
+
+def populate_class_occupancy(apps, schema_editor):
+    # Cancellations before the rollup existed are not known and start at 0.
+    ClassSlot = apps.get_model('fitness_class', 'ClassSlot')
+    ClassOccupancy = apps.get_model('fitness_class', 'ClassOccupancy')
+    totals = ClassSlot.objects.annotate(
+        week=TruncWeek('fitness_class__date'),
+    ).values(
+        'fitness_class__instructor_id', 'fitness_class__class_type', 'week',
+    ).annotate(
+        slot_count=Count('id'),
+        seats=Sum('fitness_class__member_max_count'),
+        booked=Sum('booked_count'),
+    ).order_by()
+    ClassOccupancy.objects.bulk_create(
+        (
+            ClassOccupancy(
+                instructor_id=total['fitness_class__instructor_id'],
+                class_type=total['fitness_class__class_type'], week=total['week'],
+                slots=total['slot_count'], seats=total['seats'], booked=total['booked'],
+            )
+            for total in totals
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness_class', '0008_class_slot_start_end_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField()),
+                ('class_type', models.CharField(choices=[('yoga', 'Yoga'), ('zumba', 'Zumba'), ('hiit', 'Hiit')], max_length=10)),
+                ('slots', models.PositiveIntegerField(default=0)),
+                ('seats', models.PositiveIntegerField(default=0)),
+                ('booked', models.PositiveIntegerField(default=0)),
+                ('cancellations', models.PositiveIntegerField(default=0)),
+                ('no_shows', models.PositiveIntegerField(default=0)),
+                ('instructor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='class_occupancy', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('instructor', 'week', 'class_type'), name='class_occupancy_key_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_class_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.2 on 2026-10-18 08:52
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness_class', '0009_class_occupancy'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='classoccupancy',
+            name='booked',
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 
+from core.timezones import studio_datetime
 from user.models import CustomUser
+from .managers import ClassScheduleQuerySet, ClassSlotQuerySet
 
 # Create your models here.
 class FitnessClass(models.Model):
@@ -15,6 +17,21 @@ class FitnessClass(models.Model):
     class_type = models.CharField(max_length=10, choices=FitnessClassType.choices)
     date = models.DateField()
     member_max_count = models.PositiveIntegerField(default=50)
+    # Set on the classes materialized from a recurring schedule.
+    schedule = models.ForeignKey(
+        'ClassSchedule', on_delete=models.SET_NULL, null=True, blank=True, related_name='fitness_classes'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'class_type'], name='fitness_class_date_type_idx'),
+            # An instructor's slots on given dates, for conflict detection.
+            models.Index(fields=['instructor', 'date'], name='fitness_class_instr_date_idx'),
+        ]
+        constraints = [
+            # One class per schedule occurrence, so materializing is idempotent.
+            models.UniqueConstraint(fields=['schedule', 'date'], name='fitness_class_schedule_date_uniq'),
+        ]
 
     def __str__(self):
         return self.name
@@ -23,6 +40,137 @@ class ClassSlot(models.Model):
     fitness_class = models.ForeignKey(FitnessClass, on_delete=models.CASCADE, related_name='fitness_class')
     start_time = models.TimeField()
     end_time = models.TimeField()
+    # The class date with start_time/end_time as UTC instants, so that
+    # "not started yet" is one range scan. Kept in step by build()/save().
+    start_at = models.DateTimeField()
+    end_at = models.DateTimeField()
+    # Denormalized number of ClassBooking rows for this slot, kept in step by
+    # ClassBooking.objects.book()/cancel() and checked by reconcile_booked_counts.
+    booked_count = models.PositiveIntegerField(default=0)
+    # When the class reminder went out to the slot's members.
+    reminded_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ClassSlotQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fitness_class', 'start_time'], name='class_slot_class_start_idx'),
+            models.Index(fields=['start_at', 'id'], name='class_slot_start_at_idx'),
+        ]
+
+    def __str__(self):
+        return self.fitness_class.name
+
+    @classmethod
+    def build(cls, fitness_class, start_time, end_time, **kwargs):
+        '''
+        Unsaved slot of a class, with start_at/end_at set. Use it for
+        bulk_create, which does not call save().
+        '''
+        return cls(
+            fitness_class=fitness_class, start_time=start_time, end_time=end_time,
+            start_at=studio_datetime(fitness_class.date, start_time),
+            end_at=studio_datetime(fitness_class.date, end_time),
+            **kwargs
+        )
+
+    def save(self, *args, **kwargs):
+        self.start_at = studio_datetime(self.fitness_class.date, self.start_time)
+        self.end_at = studio_datetime(self.fitness_class.date, self.end_time)
+        super().save(*args, **kwargs)
+
+    @property
+    def seats_left(self):
+        return max(self.fitness_class.member_max_count - self.booked_count, 0)
+
+
+class ClassSchedule(models.Model):
+    '''
+    Template of a recurring class. Its occurrences are materialized as
+    FitnessClass rows with their slots only up to a rolling horizon (see
+    fitness_class.schedules), so storage grows with the booking horizon
+    rather than with how long the schedule runs.
+    '''
+
+    class Frequency(models.TextChoices):
+        DAILY = 'daily'
+        WEEKLY = 'weekly'
+
+    WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+    name = models.CharField(max_length=80, unique=True)
+    instructor = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='class_schedules')
+    class_type = models.CharField(max_length=10, choices=FitnessClass.FitnessClassType.choices)
+    member_max_count = models.PositiveIntegerField(default=50)
+    frequency = models.CharField(max_length=10, choices=Frequency.choices)
+    # Bit n set for weekday n (Monday is 0), only used by weekly schedules.
+    weekdays = models.PositiveSmallIntegerField(default=0)
+    # [{"start": "HH:MM", "end": "HH:MM"}, ...] of every occurrence.
+    slots = models.JSONField()
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True)
+    # Occurrences up to this date have been materialized.
+    materialized_until = models.DateField(null=True, blank=True)
+
+    objects = ClassScheduleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['materialized_until'], name='class_schedule_horizon_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def occurs_on(self, day):
+        if day < self.start_date or (self.end_date and day > self.end_date):
+            return False
+        return self.frequency == self.Frequency.DAILY or bool(self.weekdays & (1 << day.weekday()))
+
+
+class ScheduleException(models.Model):
+    '''
+    A date on which a recurring schedule does not take place.
+    '''
+    schedule = models.ForeignKey(ClassSchedule, on_delete=models.CASCADE, related_name='exceptions')
+    date = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['schedule', 'date'], name='schedule_exception_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.schedule.name} {self.date}'
+
+
+class ClassOccupancy(models.Model):
+    '''
+    Weekly rollup of an instructor's slots of one class type, read by the
+    instructor analytics endpoint instead of aggregating ClassBooking.
+
+    slots and seats are derived from ClassSlot and can be rebuilt
+    (rebuild_occupancy); cancellations and no_shows only exist here, as
+    they are counted when they happen. Kept in step by fitness_class.occupancy.
+    Booked seats are read from ClassSlot.booked_count instead, so bookings
+    never wait on a rollup row.
+    '''
+    instructor = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='class_occupancy')
+    # Monday of the week.
+    week = models.DateField()
+    class_type = models.CharField(max_length=10, choices=FitnessClass.FitnessClassType.choices)
+    slots = models.PositiveIntegerField(default=0)
+    # Sum of member_max_count over the slots.
+    seats = models.PositiveIntegerField(default=0)
+    cancellations = models.PositiveIntegerField(default=0)
+    # Booked members who did not attend; attendance is not recorded yet.
+    no_shows = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also serves the (instructor, week range) reads of the dashboard.
+            models.UniqueConstraint(fields=['instructor', 'week', 'class_type'], name='class_occupancy_key_uniq'),
+        ]
 
     def __str__(self):
-        return self.fitness_class.name
\ No newline at end of file
+        return f'{self.instructor_id} {self.week} {self.class_type}'
@@ -0,0 +1,185 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, TruncWeek
+
+from .models import ClassOccupancy, ClassSlot
+
+# Rollup counters that are derived from the slots and can be rebuilt from them.
+DERIVED = ('slots', 'seats')
+ROLLUP = DERIVED + ('cancellations', 'no_shows')
+# Counters reported per week and class type. booked is summed from
+# ClassSlot.booked_count when read, so bookings never lock a rollup row.
+COUNTERS = ('slots', 'seats', 'booked', 'cancellations', 'no_shows')
+
+# Longest range the analytics endpoint reports on.
+MAX_WEEKS = 26
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def week_totals(instructor_id, class_type, week):
+    '''
+    slots and seats of the instructor's slots of one type in a week, read
+    through the (instructor, date) index.
+    '''
+    return ClassSlot.objects.filter(
+        fitness_class__instructor_id=instructor_id,
+        fitness_class__class_type=class_type,
+        fitness_class__date__range=(week, week + timedelta(days=6)),
+    ).aggregate(
+        slots=Count('id'),
+        seats=Coalesce(Sum('fitness_class__member_max_count'), 0),
+    )
+
+
+def update_occupancy(instructor_id, class_type, day, **deltas):
+    '''
+    Add deltas to the counters of the week of `day`, e.g. cancellations=1.
+
+    Call it in the transaction that changes the slots or bookings, after
+    the change, so the rollup commits or rolls back with it. A week
+    without a row yet is counted from its slots, which already include the
+    change, and only the event counters (cancellations, no_shows) are taken
+    from the deltas.
+    '''
+    key = {'instructor_id': instructor_id, 'week': week_start(day), 'class_type': class_type}
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not changes or ClassOccupancy.objects.filter(**key).update(**changes):
+        return
+    events = {field: max(delta, 0) for field, delta in deltas.items() if field not in DERIVED}
+    try:
+        with transaction.atomic():
+            ClassOccupancy.objects.create(**key, **week_totals(instructor_id, class_type, key['week']), **events)
+    except IntegrityError:
+        # Created by a concurrent transaction, which did not see this change.
+        ClassOccupancy.objects.filter(**key).update(**changes)
+
+
+def record_slots(slots, removed=False):
+    '''
+    Count created (or, with removed=True, deleted) slots in the rollup,
+    with one update per instructor, week and class type. The slots'
+    fitness_class must be set.
+    '''
+    groups = defaultdict(lambda: [0, 0])
+    for slot in slots:
+        fitness_class = slot.fitness_class
+        group = groups[fitness_class.instructor_id, fitness_class.class_type, week_start(fitness_class.date)]
+        group[0] += 1
+        group[1] += fitness_class.member_max_count
+    sign = -1 if removed else 1
+    for (instructor_id, class_type, week), (count, seats) in groups.items():
+        update_occupancy(instructor_id, class_type, week, slots=sign * count, seats=sign * seats)
+
+
+def rebuild_occupancy(instructor_id=None, batch_size=1000):
+    '''
+    Recompute slots and seats of every week from ClassSlot, in one
+    transaction. cancellations and no_shows are kept, as the slots do not
+    record them. Returns the number of weekly rows written.
+    '''
+    rows = ClassOccupancy.objects.all()
+    slots = ClassSlot.objects.all()
+    if instructor_id is not None:
+        rows = rows.filter(instructor_id=instructor_id)
+        slots = slots.filter(fitness_class__instructor_id=instructor_id)
+    totals = slots.annotate(
+        week=TruncWeek('fitness_class__date'),
+    ).values(
+        'fitness_class__instructor_id', 'fitness_class__class_type', 'week',
+    ).annotate(
+        slot_count=Count('id'),
+        seats=Sum('fitness_class__member_max_count'),
+    ).order_by()
+
+    with transaction.atomic():
+        rows.update(slots=0, seats=0)
+        written = ClassOccupancy.objects.bulk_create(
+            (
+                ClassOccupancy(
+                    instructor_id=total['fitness_class__instructor_id'],
+                    class_type=total['fitness_class__class_type'], week=total['week'],
+                    slots=total['slot_count'], seats=total['seats'],
+                )
+                for total in totals
+            ),
+            batch_size=batch_size, update_conflicts=True,
+            unique_fields=['instructor', 'week', 'class_type'], update_fields=list(DERIVED),
+        )
+        rows.filter(slots=0, cancellations=0, no_shows=0).delete()
+    return len(written)
+
+
+def fill_rate(booked, seats):
+    return round(booked / seats, 4) if seats else None
+
+
+def with_fill_rate(counters):
+    return {**counters, 'fill_rate': fill_rate(counters['booked'], counters['seats'])}
+
+
+def instructor_occupancy(instructor_id, first_week, last_week):
+    '''
+    Occupancy of the instructor's classes in the weeks from first_week to
+    last_week (Mondays): totals, per week, per class type, per class and
+    per slot.
+
+    Weekly and per type figures are summed from at most MAX_WEEKS rollup
+    rows per class type, classes, slots and every booked figure from
+    ClassSlot, so nothing depends on the number of bookings.
+    '''
+    last_day = last_week + timedelta(days=6)
+    rows = ClassOccupancy.objects.filter(
+        instructor_id=instructor_id, week__range=(first_week, last_week),
+    ).values('week', 'class_type', *ROLLUP)
+
+    total = dict.fromkeys(COUNTERS, 0)
+    weeks = {
+        first_week + timedelta(weeks=offset): dict.fromkeys(COUNTERS, 0)
+        for offset in range((last_week - first_week).days // 7 + 1)
+    }
+    class_types = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for row in rows:
+        for counters in (total, weeks[row['week']], class_types[row['class_type']]):
+            for counter in ROLLUP:
+                counters[counter] += row[counter]
+
+    classes = {}
+    slots = ClassSlot.objects.filter(
+        fitness_class__instructor_id=instructor_id, fitness_class__date__range=(first_week, last_day),
+    ).values_list(
+        'id', 'start_time', 'end_time', 'booked_count', 'fitness_class_id', 'fitness_class__name',
+        'fitness_class__class_type', 'fitness_class__date', 'fitness_class__member_max_count',
+    ).order_by('fitness_class__date', 'fitness_class_id', 'start_time', 'id')
+    for slot_id, start, end, booked, class_id, name, class_type, day, seats in slots:
+        fitness_class = classes.get(class_id)
+        if fitness_class is None:
+            fitness_class = classes[class_id] = {
+                'id': class_id, 'name': name, 'class_type': class_type, 'date': day.isoformat(),
+                'seats': 0, 'booked': 0, 'slots': [],
+            }
+        fitness_class['seats'] += seats
+        fitness_class['booked'] += booked
+        for counters in (total, weeks[week_start(day)], class_types[class_type]):
+            counters['booked'] += booked
+        fitness_class['slots'].append({
+            'id': slot_id, 'start_time': start.isoformat(), 'end_time': end.isoformat(),
+            'seats': seats, 'booked': booked, 'fill_rate': fill_rate(booked, seats),
+        })
+
+    return {
+        'first_week': first_week.isoformat(),
+        'last_week': last_week.isoformat(),
+        'total': with_fill_rate(total),
+        'weeks': [{'week': week.isoformat(), **with_fill_rate(counters)} for week, counters in weeks.items()],
+        'class_types': [
+            {'class_type': class_type, **with_fill_rate(class_types[class_type])}
+            for class_type in sorted(class_types)
+        ],
+        'classes': [with_fill_rate(fitness_class) for fitness_class in classes.values()],
+    }
@@ -0,0 +1,152 @@
+import logging
+from datetime import date, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+
+from core.timezones import studio_today
+from .cache import invalidate_available_classes
+from .conflicts import find_conflicts
+from .exceptions import OccurrenceBookedError
+from .models import ClassSchedule, ClassSlot, FitnessClass, ScheduleException
+from .occupancy import record_slots
+
+logger = logging.getLogger(__name__)
+
+
+def horizon_end(today=None):
+    '''
+    Last date slots are materialized up to, SCHEDULE_HORIZON_DAYS ahead.
+    '''
+    if today is None:
+        today = studio_today()
+    return today + timedelta(days=settings.SCHEDULE_HORIZON_DAYS)
+
+
+def occurrence_name(schedule, day):
+    # FitnessClass names are unique; the schedule id keeps occurrences of
+    # schedules with the same name apart.
+    return f'{schedule.name} #{schedule.id} {day.isoformat()}'
+
+
+def occurrence_dates(schedule, first, last, skipped=()):
+    '''
+    Dates from first to last the schedule occurs on, except the skipped ones.
+    '''
+    days = (first + timedelta(days=offset) for offset in range((last - first).days + 1))
+    return [day for day in days if schedule.occurs_on(day) and day not in skipped]
+
+
+def schedule_slots(schedule):
+    return [
+        {'start': time.fromisoformat(slot['start']), 'end': time.fromisoformat(slot['end'])}
+        for slot in schedule.slots
+    ]
+
+
+def materialize_schedule(schedule_id, until, today=None):
+    '''
+    Create the classes and slots of a schedule's occurrences up to `until`.
+
+    Only dates after the schedule's materialized window (and not in the
+    past or in its exceptions) are created, with one bulk INSERT per table,
+    and the window is moved to `until`. A date whose occurrence name is
+    already taken by another class, or whose slots overlap a slot the
+    instructor already teaches, is skipped and logged rather than failing
+    the run. The schedule row is locked for the transaction so
+    overlapping runs cannot create an occurrence twice. Returns the number
+    of classes created.
+    '''
+    if today is None:
+        today = studio_today()
+    with transaction.atomic():
+        schedule = ClassSchedule.objects.select_for_update().get(id=schedule_id)
+        first = max(schedule.start_date, today)
+        if schedule.materialized_until:
+            first = max(first, schedule.materialized_until + timedelta(days=1))
+        last = min(until, schedule.end_date) if schedule.end_date else until
+
+        slots = schedule_slots(schedule)
+        days = []
+        if first <= last:
+            skipped = set(schedule.exceptions.filter(date__range=(first, last)).values_list('date', flat=True))
+            days = occurrence_dates(schedule, first, last, skipped)
+            names = {occurrence_name(schedule, day): day for day in days}
+            taken = {
+                names[name]: 'name_taken'
+                for name in FitnessClass.objects.filter(name__in=names).values_list('name', flat=True)
+            }
+            # The instructor may have taken on other classes since the
+            # schedule was created.
+            conflicts = find_conflicts(
+                schedule.instructor_id,
+                [{'name': name, 'date': day, 'slots': slots} for name, day in names.items()],
+            )
+            for conflict in conflicts:
+                taken.setdefault(date.fromisoformat(conflict['slot']['date']), 'conflict')
+            for day, reason in sorted(taken.items()):
+                logger.warning('schedule occurrence skipped schedule_id=%s date=%s reason=%s', schedule.id, day, reason)
+            days = [day for day in days if day not in taken]
+
+        fitness_classes = FitnessClass.objects.bulk_create(
+            FitnessClass(
+                name=occurrence_name(schedule, day), instructor_id=schedule.instructor_id,
+                class_type=schedule.class_type, date=day, member_max_count=schedule.member_max_count,
+                schedule=schedule,
+            )
+            for day in days
+        )
+        record_slots(ClassSlot.objects.bulk_create(
+            ClassSlot.build(fitness_class, slot['start'], slot['end'])
+            for fitness_class in fitness_classes
+            for slot in slots
+        ))
+        if schedule.materialized_until is None or schedule.materialized_until < until:
+            schedule.materialized_until = until
+            schedule.save(update_fields=['materialized_until'])
+        if fitness_classes:
+            invalidate_available_classes()
+    return len(fitness_classes)
+
+
+def materialize_due_schedules(until, batch_size=100):
+    '''
+    Materialize every schedule that is behind `until`, one transaction per
+    schedule, walking the due schedules by id in batches.
+
+    Yields (schedule_id, classes created, error) per schedule.
+    '''
+    last_id = 0
+    while True:
+        schedule_ids = list(
+            ClassSchedule.objects.due(until).filter(id__gt=last_id)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not schedule_ids:
+            return
+        for schedule_id in schedule_ids:
+            try:
+                yield schedule_id, materialize_schedule(schedule_id, until), None
+            except Exception as e:
+                logger.error('schedule materialization failed schedule_id=%s error=%s', schedule_id, e)
+                yield schedule_id, 0, e
+        last_id = schedule_ids[-1]
+
+
+def add_exception(schedule, day):
+    '''
+    Cancel the occurrence of a schedule on `day`.
+
+    An occurrence that is already materialized is deleted with its slots,
+    unless a slot has bookings, which raises OccurrenceBookedError.
+    '''
+    with transaction.atomic():
+        ScheduleException.objects.get_or_create(schedule=schedule, date=day)
+        occurrence = FitnessClass.objects.filter(schedule=schedule, date=day)
+        slots = list(ClassSlot.objects.filter(fitness_class__in=occurrence).select_related('fitness_class'))
+        if any(slot.booked_count for slot in slots):
+            raise OccurrenceBookedError()
+        deleted, _ = occurrence.delete()
+        if deleted:
+            record_slots(slots, removed=True)
+            invalidate_available_classes()
@@ -1,9 +1,15 @@
 from rest_framework import serializers
-from datetime import datetime
-import pytz
+from django.db import transaction
+from datetime import datetime, timedelta
 
-from .models import FitnessClass, ClassSlot
+from .models import FitnessClass, ClassSchedule, ClassSlot, ScheduleException
 from user.serializers import CustomUserSerializer
+from core.pagination import decode_cursor
+from core.timezones import convert_from_studio, get_timezone, studio_today
+from .cache import invalidate_available_classes
+from .conflicts import describe_conflict, find_conflicts
+from .occupancy import MAX_WEEKS, record_slots, week_start
+from .schedules import horizon_end, occurrence_dates
 
 class FitnessClassSerializer(serializers.ModelSerializer):
     instructor = CustomUserSerializer(read_only=True, fields=['id', 'name', 'email'])
@@ -11,6 +17,7 @@ class FitnessClassSerializer(serializers.ModelSerializer):
     class Meta:
         model = FitnessClass
         fields = ('__all__')
+        read_only_fields = ('schedule',)
 
     def __init__(self, *args, **kwargs):
         required_fields = kwargs.pop('fields', None)
@@ -22,12 +29,221 @@ class FitnessClassSerializer(serializers.ModelSerializer):
             for field_name in existing - allowed:
                 self.fields.pop(field_name)
 
+class SlotInputSerializer(serializers.Serializer):
+    start = serializers.TimeField(input_formats=['%H:%M'])
+    end = serializers.TimeField(input_formats=['%H:%M'])
+
+    def validate(self, attrs):
+        if attrs['start'] >= attrs['end']:
+            raise serializers.ValidationError("Slot start time must be before its end time.")
+        return attrs
+
+def check_slot_overlaps(slots):
+    # Sorting by start time leaves overlapping slots next to each other.
+    ordered = sorted(slots, key=lambda slot: slot['start'])
+    for previous, current in zip(ordered, ordered[1:]):
+        if current['start'] < previous['end']:
+            raise serializers.ValidationError(
+                f"Slots {previous['start']:%H:%M}-{previous['end']:%H:%M} and "
+                f"{current['start']:%H:%M}-{current['end']:%H:%M} overlap."
+            )
+    return slots
+
+def check_instructor_conflicts(instructor_id, classes):
+    '''
+    Reject new classes whose slots overlap each other or a slot the
+    instructor already teaches. Skipped without an instructor_id in the
+    serializer context.
+    '''
+    if not instructor_id:
+        return
+    conflicts = find_conflicts(instructor_id, classes)
+    if conflicts:
+        raise serializers.ValidationError({"slots": [describe_conflict(conflict) for conflict in conflicts]})
+
+class FitnessClassListSerializer(serializers.ListSerializer):
+
+    def validate(self, attrs):
+        names = [fitness_class['name'] for fitness_class in attrs]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise serializers.ValidationError(f"Class names must be unique: {', '.join(duplicates)}")
+        # The whole batch is checked against the schedule with one query.
+        check_instructor_conflicts(self.context.get('instructor_id'), attrs)
+        return attrs
+
+    def create(self, validated_data):
+        # Every class and every slot of the batch is written with one INSERT
+        # per table, all or nothing.
+        with transaction.atomic():
+            slots_data = [fitness_class.pop('slots') for fitness_class in validated_data]
+            fitness_classes = FitnessClass.objects.bulk_create(
+                FitnessClass(**fitness_class) for fitness_class in validated_data
+            )
+            record_slots(ClassSlot.objects.bulk_create(
+                ClassSlot.build(fitness_class, slot['start'], slot['end'])
+                for fitness_class, slots in zip(fitness_classes, slots_data)
+                for slot in slots
+            ))
+            invalidate_available_classes()
+        return fitness_classes
+
+class FitnessClassCreateSerializer(FitnessClassSerializer):
+    slots = SlotInputSerializer(many=True, write_only=True, allow_empty=False)
+
+    class Meta(FitnessClassSerializer.Meta):
+        list_serializer_class = FitnessClassListSerializer
+
+    def validate_date(self, value):
+        if value <= studio_today():
+            raise serializers.ValidationError("Date must be tomorrow or later.")
+        return value
+
+    def validate_slots(self, value):
+        return check_slot_overlaps(value)
+
+    def validate(self, attrs):
+        # Bulk creation checks all of its classes at once, in the list serializer.
+        if not isinstance(self.parent, serializers.ListSerializer):
+            check_instructor_conflicts(self.context.get('instructor_id'), [attrs])
+        return attrs
+
+    def create(self, validated_data):
+        slots = validated_data.pop('slots')
+        with transaction.atomic():
+            fitness_class = FitnessClass.objects.create(**validated_data)
+            record_slots(ClassSlot.objects.bulk_create(
+                ClassSlot.build(fitness_class, slot['start'], slot['end'])
+                for slot in slots
+            ))
+            invalidate_available_classes()
+        return fitness_class
+
+def weekday_mask(weekdays):
+    return sum(1 << ClassSchedule.WEEKDAYS.index(day) for day in set(weekdays))
+
+class ClassScheduleCreateSerializer(serializers.ModelSerializer):
+    slots = SlotInputSerializer(many=True, allow_empty=False)
+    weekdays = serializers.ListField(
+        child=serializers.ChoiceField(choices=ClassSchedule.WEEKDAYS), required=False, allow_empty=False
+    )
+    exceptions = serializers.ListField(child=serializers.DateField(), required=False)
+
+    class Meta:
+        model = ClassSchedule
+        fields = ('name', 'class_type', 'member_max_count', 'frequency', 'weekdays', 'slots',
+                  'start_date', 'end_date', 'exceptions')
+
+    def validate_start_date(self, value):
+        if value <= studio_today():
+            raise serializers.ValidationError("Date must be tomorrow or later.")
+        return value
+
+    def validate_slots(self, value):
+        return check_slot_overlaps(value)
+
+    def validate(self, attrs):
+        if attrs.get('end_date') and attrs['end_date'] < attrs['start_date']:
+            raise serializers.ValidationError({"end_date": "End date must not be before the start date."})
+        if attrs['frequency'] == ClassSchedule.Frequency.WEEKLY and not attrs.get('weekdays'):
+            raise serializers.ValidationError({"weekdays": "Weekly schedules need at least one weekday."})
+        # The occurrences created right away are checked like new classes;
+        # later ones are checked again when they are materialized.
+        schedule = ClassSchedule(
+            frequency=attrs['frequency'], weekdays=weekday_mask(attrs.get('weekdays', [])),
+            start_date=attrs['start_date'], end_date=attrs.get('end_date'),
+        )
+        last = min(attrs['end_date'], horizon_end()) if attrs.get('end_date') else horizon_end()
+        check_instructor_conflicts(self.context.get('instructor_id'), [
+            {'name': attrs['name'], 'date': day, 'slots': attrs['slots']}
+            for day in occurrence_dates(schedule, attrs['start_date'], last, set(attrs.get('exceptions', [])))
+        ])
+        return attrs
+
+    def create(self, validated_data):
+        exceptions = set(validated_data.pop('exceptions', []))
+        validated_data['weekdays'] = weekday_mask(validated_data.pop('weekdays', []))
+        validated_data['slots'] = [
+            {'start': slot['start'].strftime('%H:%M'), 'end': slot['end'].strftime('%H:%M')}
+            for slot in validated_data['slots']
+        ]
+        with transaction.atomic():
+            schedule = ClassSchedule.objects.create(**validated_data)
+            ScheduleException.objects.bulk_create(
+                ScheduleException(schedule=schedule, date=day) for day in exceptions
+            )
+        return schedule
+
+class ScheduleCheckSerializer(serializers.Serializer):
+    '''
+    Classes to check against the instructor's schedule, before creating them.
+    '''
+    class ProposedClassSerializer(serializers.Serializer):
+        name = serializers.CharField(max_length=100, required=False)
+        date = serializers.DateField()
+        slots = SlotInputSerializer(many=True, allow_empty=False)
+
+    classes = ProposedClassSerializer(many=True, allow_empty=False, max_length=500)
+
+class ScheduleExceptionSerializer(serializers.Serializer):
+    date = serializers.DateField()
+
+class AvailableClassesQuerySerializer(serializers.Serializer):
+    '''
+    Query params of the available classes listing.
+    '''
+    class_type = serializers.ChoiceField(choices=FitnessClass.FitnessClassType.choices, required=False)
+    instructor = serializers.IntegerField(min_value=1, required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    min_seats = serializers.IntegerField(min_value=1, required=False)
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=50)
+
+    def validate_cursor(self, value):
+        try:
+            start_at, slot_id = decode_cursor(value, 2)
+            start_at = datetime.fromisoformat(start_at)
+            if start_at.tzinfo is None:
+                raise ValueError(start_at)
+            return start_at, int(slot_id)
+        except ValueError:
+            raise serializers.ValidationError("Invalid cursor.")
+
+    def validate(self, attrs):
+        if attrs.get('date_from') and attrs.get('date_to') and attrs['date_to'] < attrs['date_from']:
+            raise serializers.ValidationError({"date_to": "End date must not be before the start date."})
+        return attrs
+
+class OccupancyQuerySerializer(serializers.Serializer):
+    '''
+    Query params of the instructor analytics endpoint, widened to whole
+    weeks. Defaults to the last three weeks, this week and the next four.
+    '''
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if 'date_from' in attrs:
+            first_week = week_start(attrs['date_from'])
+        else:
+            first_week = week_start(studio_today()) - timedelta(weeks=3)
+        last_week = week_start(attrs['date_to']) if 'date_to' in attrs else first_week + timedelta(weeks=7)
+        if last_week < first_week:
+            raise serializers.ValidationError({"date_to": "End date must not be before the start date."})
+        if (last_week - first_week).days // 7 >= MAX_WEEKS:
+            raise serializers.ValidationError({"date_to": f"At most {MAX_WEEKS} weeks at a time."})
+        return {'first_week': first_week, 'last_week': last_week}
+
 class ClassSlotSerializer(serializers.ModelSerializer):
     fitness_class = FitnessClassSerializer(read_only=True, fields=['id', 'name', 'instructor', 'class_type', 'date'])
+    seats_left = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = ClassSlot
-        fields = ('__all__')
+        # start_at/end_at repeat date and times in UTC, reminded_at is
+        # bookkeeping of the reminder scheduler.
+        exclude = ('start_at', 'end_at', 'reminded_at')
 
     def __init__(self, *args, **kwargs):
         required_fields = kwargs.pop('fields', None)
@@ -48,35 +264,48 @@ class ClassSlotSerializer(serializers.ModelSerializer):
             self.target_timezone = self.context.get('target_timezone', None)
 
         if self.target_timezone:
-            # Getting target timezone and Asia/Kolkata timezone
-            target_tz = pytz.timezone(self.target_timezone)
-            kolkata_tz = pytz.timezone('Asia/Kolkata')
-
-            start_time = instance.start_time
-            end_time = instance.end_time
-
-            # Getting datetime object for Asia/Kolkata timezone
-            start_time_kolkata = kolkata_tz.localize(datetime.combine(datetime.today(), start_time))
-            end_time_kolkata = kolkata_tz.localize(datetime.combine(datetime.today(), end_time))
+            # Resolved once per serializer, i.e. once per request for listings
+            if isinstance(self.target_timezone, str):
+                self.target_timezone = get_timezone(self.target_timezone)
+            class_date = instance.fitness_class.date
 
-            # Convert to target timezone time object
-            start_time_target = start_time_kolkata.astimezone(target_tz).time()
-            end_time_target = end_time_kolkata.astimezone(target_tz).time()
+            # The class date follows the start time into the target timezone
+            class_date_target, start_time_target = convert_from_studio(class_date, instance.start_time, self.target_timezone)
+            _, end_time_target = convert_from_studio(class_date, instance.end_time, self.target_timezone)
 
             representation['start_time'] = start_time_target
             representation['end_time'] = end_time_target
+            representation['fitness_class']['date'] = class_date_target
 
-            # Handle the date field in FitnessClassSerializer
-            fitness_class_representation = representation['fitness_class']
-            class_date_str = fitness_class_representation.get('date')
-            class_date = datetime.strptime(class_date_str, "%Y-%m-%d").date()
+        return representation
 
-            if class_date:
-                # Convert the date to the target timezone if it's present
-                class_date = datetime.combine(class_date, start_time)  
-                class_date_kolkata = kolkata_tz.localize(class_date)
-                class_date_target = class_date_kolkata.astimezone(target_tz).date()
+def user_representation(user):
+    return {'id': user.id, 'name': user.name, 'email': user.email}
 
-                fitness_class_representation['date'] = class_date_target
+def slot_representation(slot, target_timezone=None):
+    '''
+    Read-only fast path of ClassSlotSerializer for listings.
 
-        return representation
\ No newline at end of file
+    Produces the same JSON as ClassSlotSerializer(slot).data without the
+    per-field ModelSerializer machinery. target_timezone must already be
+    resolved with get_timezone.
+    '''
+    fitness_class = slot.fitness_class
+    class_date, start_time, end_time = fitness_class.date, slot.start_time, slot.end_time
+    if target_timezone:
+        class_date, start_time = convert_from_studio(fitness_class.date, slot.start_time, target_timezone)
+        _, end_time = convert_from_studio(fitness_class.date, slot.end_time, target_timezone)
+    return {
+        'id': slot.id,
+        'fitness_class': {
+            'id': fitness_class.id,
+            'instructor': user_representation(fitness_class.instructor),
+            'name': fitness_class.name,
+            'class_type': fitness_class.class_type,
+            'date': class_date.isoformat(),
+        },
+        'seats_left': slot.seats_left,
+        'start_time': start_time.isoformat(),
+        'end_time': end_time.isoformat(),
+        'booked_count': slot.booked_count,
+    }
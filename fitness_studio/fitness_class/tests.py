@@ -1,3 +1,228 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import AsyncRequestFactory, TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.seed import create_instructor, create_members, create_slots
+from core.timezones import studio_today
+from user.models import CustomUser
+from .cache import available_classes_cache
+from class_booking.models import ClassBooking
+from .models import ClassOccupancy, ClassSchedule, ClassSlot, FitnessClass
+from .occupancy import instructor_occupancy, rebuild_occupancy, week_start
+from .schedules import materialize_schedule, occurrence_name
+from .views import get_available_classes_async
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+class CreateClassesTests(TestCase):
+
+    def setUp(self):
+        self.instructor = create_instructor()
+        self.client = client_for(self.instructor)
+        self.date = (studio_today() + timedelta(days=1)).isoformat()
+
+    def test_creates_every_class(self):
+        classes = [
+            {'name': f'Yoga {i}', 'class_type': 'yoga', 'date': self.date,
+             'slots': [{'start': f'{6 + i:02d}:00', 'end': f'{6 + i:02d}:45'}]}
+            for i in range(3)
+        ]
+        response = self.client.post('/class/create_classes', {'classes': classes}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(FitnessClass.objects.count(), 3)
+
+    def test_rejects_a_body_that_is_not_an_object(self):
+        response = self.client.post('/class/create_classes', [{'name': 'Yoga'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['status'], 'Error')
+
+
+class ScheduleTests(TestCase):
+
+    def setUp(self):
+        self.instructor = create_instructor()
+        self.client = client_for(self.instructor)
+        self.tomorrow = studio_today() + timedelta(days=1)
+
+    def create_schedule(self, **fields):
+        return ClassSchedule.objects.create(**{
+            'name': 'Morning Yoga', 'instructor': self.instructor, 'class_type': 'yoga',
+            'frequency': ClassSchedule.Frequency.DAILY, 'slots': [{'start': '07:00', 'end': '08:00'}],
+            'start_date': self.tomorrow, 'end_date': self.tomorrow + timedelta(days=2), **fields,
+        })
+
+    def test_occurrence_with_a_taken_name_is_skipped(self):
+        schedule = self.create_schedule()
+        FitnessClass.objects.create(
+            name=occurrence_name(schedule, self.tomorrow), instructor=self.instructor,
+            class_type='yoga', date=self.tomorrow + timedelta(days=30),
+        )
+        with self.assertLogs('fitness_class.schedules', 'WARNING'):
+            self.assertEqual(materialize_schedule(schedule.id, self.tomorrow + timedelta(days=5)), 2)
+        self.assertEqual(FitnessClass.objects.filter(schedule=schedule).count(), 2)
+
+    def test_schedule_is_rolled_back_when_materializing_fails(self):
+        body = {
+            'name': 'Evening HIIT', 'class_type': 'hiit', 'frequency': 'daily',
+            'slots': [{'start': '18:00', 'end': '19:00'}], 'start_date': self.tomorrow.isoformat(),
+        }
+        with mock.patch('fitness_class.views.materialize_schedule', side_effect=RuntimeError('boom')):
+            response = self.client.post('/class/schedules', body, format='json')
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(ClassSchedule.objects.exists())
+
+
+    def test_rejects_a_schedule_overlapping_a_class(self):
+        create_slots(self.instructor, [self.tomorrow + timedelta(days=1)], first_hour=18)
+        body = {
+            'name': 'Evening HIIT', 'class_type': 'hiit', 'frequency': 'daily',
+            'slots': [{'start': '18:30', 'end': '19:30'}], 'start_date': self.tomorrow.isoformat(),
+        }
+        response = self.client.post('/class/schedules', body, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('slots', response.json()['data'])
+        self.assertFalse(ClassSchedule.objects.exists())
+
+    def test_materialize_skips_occurrences_that_now_conflict(self):
+        schedule = self.create_schedule()
+        create_slots(self.instructor, [self.tomorrow + timedelta(days=1)], first_hour=7)
+        with self.assertLogs('fitness_class.schedules', 'WARNING') as logs:
+            self.assertEqual(materialize_schedule(schedule.id, self.tomorrow + timedelta(days=5)), 2)
+        self.assertIn('reason=conflict', logs.output[0])
+        self.assertNotIn(
+            self.tomorrow + timedelta(days=1),
+            FitnessClass.objects.filter(schedule=schedule).values_list('date', flat=True),
+        )
+
+class AvailableClassesTests(TestCase):
+
+    def setUp(self):
+        self.client = client_for(CustomUser.objects.get(id=create_members(1)[0]))
+
+    def test_rejects_date_from_after_date_to(self):
+        response = self.client.get('/class/', {'date_from': '2030-01-10', 'date_to': '2030-01-01'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('date_to', response.json()['data'])
+
+
+class AvailableClassesCacheTests(TestCase):
+
+    def setUp(self):
+        self.instructor = create_instructor()
+        self.slot, = create_slots(self.instructor, [studio_today() + timedelta(days=1)])
+        self.member = CustomUser.objects.get(id=create_members(1)[0])
+        self.client = client_for(self.member)
+        available_classes_cache.bump()
+
+    def assert_listing_invalidated_by(self, change):
+        self.assertEqual(self.client.get('/class/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/class/')['X-Cache'], 'HIT')
+        # The version is bumped when the change commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertEqual(self.client.get('/class/')['X-Cache'], 'MISS')
+
+    def test_booking_invalidates_the_listing(self):
+        slot = ClassSlot.objects.select_related('fitness_class').get(id=self.slot.id)
+        self.assert_listing_invalidated_by(lambda: ClassBooking.objects.book(slot, self.member))
+
+    def test_cancellation_invalidates_the_listing(self):
+        slot = ClassSlot.objects.select_related('fitness_class').get(id=self.slot.id)
+        ClassBooking.objects.book(slot, self.member)
+        self.assert_listing_invalidated_by(lambda: ClassBooking.objects.cancel(slot, self.member))
+
+    def test_class_creation_invalidates_the_listing(self):
+        body = {
+            'name': 'Zumba', 'class_type': 'zumba', 'date': (studio_today() + timedelta(days=2)).isoformat(),
+            'slots': [{'start': '09:00', 'end': '10:00'}],
+        }
+        self.assert_listing_invalidated_by(
+            lambda: self.assertEqual(
+                client_for(self.instructor).post('/class/create_class', body, format='json').status_code, 201
+            )
+        )
+
+
+class AvailableClassesAsyncTests(TestCase):
+
+    def setUp(self):
+        create_slots(create_instructor(), [studio_today() + timedelta(days=1)])
+        member = CustomUser.objects.get(id=create_members(1)[0])
+        self.authorization = f'Bearer {AccessToken.for_user(member)}'
+        available_classes_cache.bump()
+
+    async def test_caches_the_listing_through_the_async_cache_api(self):
+        factory = AsyncRequestFactory()
+        statuses = []
+        for _ in range(2):
+            response = await get_available_classes_async(
+                factory.get('/class/', headers={'Authorization': self.authorization})
+            )
+            self.assertEqual(response.status_code, 200)
+            statuses.append(response['X-Cache'])
+        self.assertEqual(statuses, ['MISS', 'HIT'])
+
+
+class OccupancyTests(TestCase):
+
+    def setUp(self):
+        self.instructor = create_instructor()
+        tomorrow = studio_today() + timedelta(days=1)
+        slots = {
+            'yoga': [{'start': '06:00', 'end': '06:45'}, {'start': '08:00', 'end': '08:45'}],
+            'hiit': [{'start': '10:00', 'end': '10:45'}],
+        }
+        classes = [
+            {'name': f'{class_type} {week}', 'class_type': class_type,
+             'date': (tomorrow + timedelta(weeks=week)).isoformat(), 'slots': slots[class_type]}
+            for week in range(2) for class_type in slots
+        ]
+        response = client_for(self.instructor).post('/class/create_classes', {'classes': classes}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.first_week = week_start(tomorrow)
+
+    def book_and_cancel(self):
+        members = create_members(4)
+        slots = list(ClassSlot.objects.select_related('fitness_class').order_by('id'))
+        for i, slot in enumerate(slots):
+            for user_id in members[:i + 1]:
+                ClassBooking.objects.book(slot, CustomUser(id=user_id))
+        ClassBooking.objects.cancel(slots[-1], CustomUser(id=members[0]))
+        ClassBooking.objects.cancel(slots[0], CustomUser(id=members[0]))
+
+    def rollup(self):
+        return list(ClassOccupancy.objects.order_by('week', 'class_type').values(
+            'instructor_id', 'week', 'class_type', 'slots', 'seats', 'cancellations', 'no_shows'
+        ))
+
+    def test_rebuild_matches_the_incremental_rollup(self):
+        self.book_and_cancel()
+        incremental = self.rollup()
+        self.assertEqual(len(incremental), 4)
+        rebuild_occupancy()
+        self.assertEqual(self.rollup(), incremental)
+
+    def test_booked_is_read_from_the_slots(self):
+        self.book_and_cancel()
+        report = instructor_occupancy(self.instructor.id, self.first_week, self.first_week + timedelta(weeks=1))
+        self.assertEqual(report['total']['booked'], ClassBooking.objects.count())
+        self.assertEqual(report['total']['cancellations'], 2)
+        self.assertEqual(
+            sum(week['booked'] for week in report['weeks']),
+            sum(class_type['booked'] for class_type in report['class_types']),
+        )
+
+    def test_booking_does_not_touch_the_rollup(self):
+        slot = ClassSlot.objects.select_related('fitness_class').first()
+        member = CustomUser(id=create_members(1)[0])
+        with mock.patch('class_booking.managers.update_occupancy') as update_occupancy:
+            ClassBooking.objects.book(slot, member)
+        update_occupancy.assert_not_called()
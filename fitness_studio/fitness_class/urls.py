@@ -1,8 +1,15 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
 
 urlpatterns = [
        path('create_class', views.create_fitness_class, name='create_class'),
-       path('', views.get_available_classes, name='get_available_classes')
+       path('create_classes', views.create_fitness_classes, name='create_classes'),
+       path('check_schedule', views.check_schedule, name='check_schedule'),
+       path('schedules', views.create_class_schedule, name='create_class_schedule'),
+       path('schedules/<int:schedule_id>/exceptions', views.add_schedule_exception, name='add_schedule_exception'),
+       path('export', views.export_class_slots, name='export_class_slots'),
+       path('analytics', views.get_instructor_analytics, name='get_instructor_analytics'),
+       path('', views.get_available_classes_async if settings.ASYNC_READ_VIEWS else views.get_available_classes, name='get_available_classes')
 ]
\ No newline at end of file
@@ -1,14 +1,30 @@
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework import status
-from datetime import datetime
-import pytz
-from django.db.models import Q, Count
+import logging
 
-from .models import FitnessClass, ClassSlot
+from .models import ClassSchedule, ClassSlot
+from .exceptions import ScheduleError
+from .schedules import add_exception, horizon_end, materialize_schedule
+from .conflicts import find_conflicts, find_schedule_conflicts
+from .occupancy import instructor_occupancy
+from django.db import transaction
+from django.utils import timezone
+
+from core.timezones import get_timezone, studio_today
 from core.permissions import IsInstructor, IsUser
-from .serializers import FitnessClassSerializer, ClassSlotSerializer
-from class_booking.models import ClassBooking
+from .serializers import (
+    FitnessClassCreateSerializer, ClassScheduleCreateSerializer, ScheduleCheckSerializer, ScheduleExceptionSerializer,
+    AvailableClassesQuerySerializer, OccupancyQuerySerializer, slot_representation,
+)
+from core.pagination import encode_cursor
+from core.authentication import authenticate_async
+from core.http import json_response
+from core.streaming import EXPORT_FORMATS, export_response, is_asgi
+from core.profiling import timed
+from .cache import available_classes_cache
+
+logger = logging.getLogger(__name__)
 
 # Create your views here.
 @api_view(['POST'])
@@ -36,32 +52,200 @@ def create_fitness_class(request):
     Responses:
         - Success: If the class is created successfully, returns a status of "Success" 
           along with the message.
-        - Error: If validation fails, returns a status of "Error" along with validation 
-          errors.
+        - Error: If validation fails (including a date that is not tomorrow or later, 
+          a slot ending before it starts, overlapping slots or slots overlapping 
+          the instructor's other classes), returns a status of "Error" along with 
+          validation errors.
         - Exception: In case of an unexpected error, returns a status of "Error" 
           with the exception message.
     '''
     try:
+        serializer = FitnessClassCreateSerializer(data=request.data, context={'instructor_id': request.user.id})
+        if serializer.is_valid():
+            serializer.save(instructor_id=request.user.id)
+            logger.info('class created class_id=%s instructor_id=%s', serializer.instance.id, request.user.id)
+            return Response({"status":"Success", "message":"Class Created"}, status=status.HTTP_201_CREATED)
+        return Response({"status":"Error", "data":serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # IST timezone
-        ist = pytz.timezone('Asia/Kolkata')
-        today_date_ist = datetime.now(ist).date()
-        date_obj = datetime.strptime(request.data['date'], '%Y-%m-%d').date()
-        if date_obj > today_date_ist:
-
-            serializer = FitnessClassSerializer(data=request.data)
-            if serializer.is_valid():
-                serializer.save(instructor=request.user)
-                for slot in request.data['slots']:
-                    start = datetime.strptime(slot['start'], '%H:%M').time()
-                    end = datetime.strptime(slot['end'], '%H:%M').time()
-                    ClassSlot.objects.create(fitness_class=serializer.instance, start_time=start, end_time=end)
-                return Response({"status":"Success", "message":"Class Created"}, status=status.HTTP_201_CREATED)
-            return Response({"status":"Error", "data":serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
-        return Response({"status":"Error", "message":"Date must be tomorrow or later."}, status=status.HTTP_400_BAD_REQUEST)
+@api_view(['POST'])
+@permission_classes([IsInstructor])
+def create_fitness_classes(request):
+    '''
+    Create many classes at once for the logged in instructor, e.g. to import 
+    a month's schedule in one request.
+
+    The user must include their access token in the request 
+    headers to authenticate the request. Every class is validated before 
+    anything is saved, and either all classes are created or none.
+
+    HTTP Method:
+        POST
+    
+    Request Data:
+        - classes (list of objects): Each object takes the same fields as 
+          the create_class endpoint (name, class_type, date, member_max_count 
+          and slots). At most 500 classes per request.
+
+    Responses:
+        - Success: If the classes are created successfully, returns a status of 
+          "Success" along with the number of classes created.
+        - Error: If validation fails, returns a status of "Error" along with the 
+          validation errors of each class.
+        - Exception: In case of an unexpected error, returns a status of "Error" 
+          with the exception message.
+    '''
+    try:
+        if not isinstance(request.data, dict):
+            return Response({"status":"Error", "data":{"non_field_errors":["Expected an object with a classes list."]}}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = FitnessClassCreateSerializer(
+            data=request.data.get('classes'), many=True, allow_empty=False, max_length=500,
+            context={'instructor_id': request.user.id},
+        )
+        if serializer.is_valid():
+            fitness_classes = serializer.save(instructor_id=request.user.id)
+            logger.info('classes created count=%d instructor_id=%s', len(fitness_classes), request.user.id)
+            return Response({"status":"Success", "message":f"{len(fitness_classes)} Classes Created"}, status=status.HTTP_201_CREATED)
+        return Response({"status":"Error", "data":serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsInstructor])
+def check_schedule(request):
+    '''
+    Find overlapping slots in the logged in instructor's schedule.
+
+    The user must include their access token in the request 
+    headers to authenticate the request. Creating a class already 
+    rejects slots that overlap the instructor's other slots; this 
+    endpoint checks a whole schedule in one request.
+
+    HTTP Method:
+        GET: Check the instructor's existing slots from today on.
+        POST: Check classes before creating them, against each other 
+              and the existing slots.
+    
+    Request Data (POST):
+        - classes (list of objects): Each object has the date, the slots and, 
+          optionally, the name of a class, as for the create_class endpoint.
+
+    Responses:
+        - Success: Returns a status of "Success" along with the list of conflicts. 
+          Each conflict has the two overlapping slots (slot id, class id, class 
+          name, date, start and end time; new slots have no ids). An empty list 
+          means there are no conflicts.
+        - Error: If validation fails, returns a status of "Error" along with 
+          validation errors.
+        - Exception: In case of an unexpected error, returns a status of "Error" 
+          with the exception message.
+    '''
+    try:
+        if request.method == 'GET':
+            conflicts = find_schedule_conflicts(request.user.id, studio_today())
+        else:
+            serializer = ScheduleCheckSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response({"status":"Error", "data":serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+            conflicts = find_conflicts(request.user.id, serializer.validated_data['classes'])
+        return Response({"status":"Success", "data":conflicts}, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST'])
+@permission_classes([IsInstructor])
+def create_class_schedule(request):
+    '''
+    Create a recurring class schedule for the logged in instructor.
+
+    The user must include their access token in the request 
+    headers to authenticate the request. The classes of the schedule 
+    are created ahead for the next SCHEDULE_HORIZON_DAYS days, and the 
+    materialize_schedules command keeps creating them as time passes.
+    Each class is named after the schedule, its id and its date.
+
+    HTTP Method:
+        POST
     
+    Request Data:
+        - name (str): The name of the schedule (must be unique).
+        - class_type (str): The type of class (e.g., yoga, zumba or hiit).
+        - member_max_count (int): Maximum allowed members for each slot (not mandatory).
+        - frequency (str): daily or weekly.
+        - weekdays (list of str): The days of a weekly schedule, e.g. ["monday", "thursday"].
+        - slots (list of objects): Start time and end time (24 hr. format) of 
+          each slot of every class, as for the create_class endpoint.
+        - start_date (str): The first date of the schedule (yyyy-mm-dd, tomorrow or later).
+        - end_date (str): The last date of the schedule (not mandatory).
+        - exceptions (list of str): Dates on which the class does not take place 
+          (not mandatory).
+
+    Responses:
+        - Success: If the schedule is created successfully, returns a status of 
+          "Success" along with the message, the schedule id and the number of 
+          classes created so far.
+        - Error: If validation fails, e.g. when a class within the next 
+          SCHEDULE_HORIZON_DAYS days overlaps a slot the instructor already 
+          teaches, returns a status of "Error" along with validation errors.
+        - Exception: In case of an unexpected error, returns a status of "Error" 
+          with the exception message.
+    '''
+    try:
+        serializer = ClassScheduleCreateSerializer(data=request.data, context={'instructor_id': request.user.id})
+        if serializer.is_valid():
+            # A schedule is never left without its first classes.
+            with transaction.atomic():
+                schedule = serializer.save(instructor_id=request.user.id)
+                created = materialize_schedule(schedule.id, horizon_end())
+            logger.info('schedule created schedule_id=%s instructor_id=%s classes=%d', schedule.id, request.user.id, created)
+            return Response({"status":"Success", "message":"Schedule Created", "data":{"id":schedule.id, "classes_created":created}}, status=status.HTTP_201_CREATED)
+        return Response({"status":"Error", "data":serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST'])
+@permission_classes([IsInstructor])
+def add_schedule_exception(request, schedule_id):
+    '''
+    Cancel one date of a recurring schedule of the logged in instructor.
+
+    The user must include their access token in the request 
+    headers to authenticate the request. The id of the schedule 
+    should be passed with the url. If the class of that date has 
+    already been created, it is deleted.
+
+    HTTP Method:
+        POST
+    
+    Request Data:
+        - date (str): The date to cancel (yyyy-mm-dd).
+
+    Responses:
+        - Success: If the date is cancelled, returns a status of "Success" along 
+          with the message.
+        - Error: If the date is invalid, the schedule is not found or the class 
+          of that date already has bookings, returns a status of "Error" along 
+          with error message.
+        - Exception: In case of an unexpected error, returns a status of "Error" 
+          with the exception message.
+    '''
+    try:
+        serializer = ScheduleExceptionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"status":"Error", "data":serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        schedule = ClassSchedule.objects.filter(id=schedule_id, instructor_id=request.user.id).first()
+        if schedule is None:
+            return Response({"status":"Error", "message":"Schedule not found"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            add_exception(schedule, serializer.validated_data['date'])
+        except ScheduleError as e:
+            return Response({"status":"Error", "message":str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        logger.info('schedule exception added schedule_id=%s date=%s', schedule.id, serializer.validated_data['date'])
+        return Response({"status":"Success", "message":"Date Cancelled"}, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['GET'])
 @permission_classes([IsUser])
 def get_available_classes(request):
@@ -71,62 +255,216 @@ def get_available_classes(request):
     The user must include their access token in the request 
     headers to authenticate the request. If the user is logging 
     from different timezone, then that timezone is passed as 
-    query param.
+    query param. Slots are ordered by date, start time and id and 
+    returned one page at a time.
 
     HTTP Method:
         GET
 
+    Query Params:
+        - timezone (str): Timezone to show the slot times in (not mandatory).
+        - class_type (str): Only slots of this class type (not mandatory).
+        - instructor (int): Only slots of this instructor id (not mandatory).
+        - date_from (str): Only slots on or after this date, yyyy-mm-dd (not mandatory).
+        - date_to (str): Only slots on or before this date, yyyy-mm-dd (not mandatory).
+        - min_seats (int): Only slots with at least this many seats left (not mandatory).
+        - limit (int): Page size, 1 to 100 (default 50).
+        - cursor (str): The next_cursor of the previous page (not mandatory).
+
     Responses:
-        - Success: Returns a success status along with all available class slots 
-          and their corresponding details.
+        - Success: Returns a success status along with a page of available class slots, 
+          their remaining seats and their corresponding details, and the cursor of 
+          the next page (null on the last page).
+        - Error: If a query param is invalid, returns a status of "Error" along with 
+          validation errors.
         - Exception: In case of an unexpected error, returns a status of "Error" 
           with the exception message.
     '''
     try:
-        # IST timezone
-        ist = pytz.timezone('Asia/Kolkata')
-        today_ist = datetime.now(ist)
-        today_date_ist = today_ist.date()
-        today_time_ist = today_ist.time()
-
-        # For getting class id's that starts tomorrow or later.
-        upcoming_classes = FitnessClass.objects.filter(date__gt=today_date_ist).values_list('id', flat=True)
-        print(upcoming_classes)
-
-        # For getting class id's that is today but not has begun.
-        today_classes = FitnessClass.objects.filter(date=today_date_ist).values_list('id', flat=True)
-        print(today_classes)
-
-        # For getting slots that hasn't started yet.
-        available_slots = ClassSlot.objects.select_related('fitness_class').filter(
-            Q(fitness_class__id__in=upcoming_classes) |
-            Q(fitness_class__id__in=today_classes, start_time__gt=today_time_ist)
+        params = AvailableClassesQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response({"status":"Error", "data":params.errors}, status=status.HTTP_400_BAD_REQUEST)
+        filters = dict(params.validated_data)
+        # An invalid or missing timezone falls back to the studio timezone.
+        target_timezone = get_timezone(request.query_params.get('timezone'))
+
+        # Every member gets the same listing for the same params, so the
+        # response is shared until a class is created or a slot is booked.
+        cache_key = available_classes_cache.make_key(*available_classes_cache_parts(filters, target_timezone))
+        payload = available_classes_cache.get(cache_key)
+        if payload is None:
+            payload = available_classes_payload(filters, target_timezone)
+            available_classes_cache.set(cache_key, payload)
+            cache_status = 'MISS'
+        else:
+            cache_status = 'HIT'
+
+        response = Response(payload, status=status.HTTP_200_OK)
+        response['X-Cache'] = cache_status
+        logger.debug('available classes cache=%s', cache_status)
+        return response
+    except Exception as e:
+        return Response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsInstructor])
+def export_class_slots(request):
+    '''
+    Export every slot of the logged in instructor's classes, including 
+    past and full ones.
+
+    The user must include their access token in the request 
+    headers to authenticate the request. The slots are streamed 
+    as a file download, so any number of slots can be exported.
+
+    HTTP Method:
+        GET
+
+    Query Params:
+        - output (str): File format, json, ndjson or csv (default json).
+        - timezone (str): Timezone to show the slot times in (not mandatory).
+
+    Responses:
+        - Success: Streams the slots in the same shape as the available classes 
+          endpoint, ordered by date, start time and id. CSV files have one column 
+          per field, with nested fields named like fitness_class.name.
+        - Error: If the output format is not supported, returns a status of 
+          "Error" along with the validation error.
+        - Exception: In case of an unexpected error, returns a status of "Error" 
+          with the exception message.
+    '''
+    try:
+        output = request.query_params.get('output', 'json')
+        if output not in EXPORT_FORMATS:
+            return Response({"status":"Error", "data":{"output":[f"Choose one of {', '.join(EXPORT_FORMATS)}."]}}, status=status.HTTP_400_BAD_REQUEST)
+        # An invalid or missing timezone falls back to the studio timezone.
+        target_timezone = get_timezone(request.query_params.get('timezone'))
+        slots = ClassSlot.objects.select_related('fitness_class__instructor').filter(
+            fitness_class__instructor_id=request.user.id
+        ).order_by('fitness_class__date', 'start_time', 'id')
+        logger.info('class slots export instructor_id=%s output=%s', request.user.id, output)
+        return export_response(
+            slots, lambda slot: slot_representation(slot, target_timezone), output, 'class_slots',
+            asynchronous=is_asgi(request),
         )
-        print(available_slots)
-
-        # For getting the number of bookings for each slot.
-        booked_slots_count = ClassBooking.objects.values('class_slot').annotate(booked_slot_count=Count('user')).values('class_slot__id', 'booked_slot_count')
-        print(booked_slots_count)
-
-        # For checking if any of the available_slots has max bookings reached.
-        new_available_slots = []
-        for slot in available_slots:
-            current_slot = list(filter(lambda s: s['class_slot__id'] == slot.id, booked_slots_count))
-            if current_slot:
-                print(current_slot[0]['booked_slot_count'])
-                print(slot.fitness_class.member_max_count)
-                if slot.fitness_class.member_max_count != current_slot[0]['booked_slot_count']:
-                    new_available_slots.append(slot)
-            else:
-                new_available_slots.append(slot)
-
-        # For checking the entered timezone is valid.
-        try:
-            pytz.timezone(request.query_params.get('timezone'))
-            serializer = ClassSlotSerializer(new_available_slots, many=True, target_timezone=request.query_params.get('timezone'))
-        except pytz.UnknownTimeZoneError:     
-            serializer = ClassSlotSerializer(new_available_slots, many=True)
+    except Exception as e:
+        return Response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsInstructor])
+def get_instructor_analytics(request):
+    '''
+    Get how full the logged in instructor's classes are.
+
+    The user must include their access token in the request 
+    headers to authenticate the request. Weekly and per class type 
+    figures come from a rollup that is updated as members book and 
+    cancel, so the response does not get slower as bookings grow.
+
+    HTTP Method:
+        GET
+
+    Query Params:
+        - date_from (str): First date to report on, yyyy-mm-dd (not mandatory).
+        - date_to (str): Last date to report on, yyyy-mm-dd (not mandatory).
+          The range is widened to whole weeks (Monday to Sunday), at most 26. 
+          Defaults to the last three weeks, this week and the next four.
 
-        return Response({"status":"Success", "data": serializer.data}, status=status.HTTP_200_OK)
+    Responses:
+        - Success: Returns a success status along with the totals of the range, 
+          one entry per week and per class type (slots, seats, booked, 
+          cancellations, no_shows and fill_rate), and each class with its slots 
+          (seats, booked and fill_rate). fill_rate is booked / seats, or null 
+          without seats.
+        - Error: If a query param is invalid, returns a status of "Error" along with 
+          validation errors.
+        - Exception: In case of an unexpected error, returns a status of "Error" 
+          with the exception message.
+    '''
+    try:
+        params = OccupancyQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response({"status":"Error", "data":params.errors}, status=status.HTTP_400_BAD_REQUEST)
+        data = instructor_occupancy(request.user.id, **params.validated_data)
+        return Response({"status":"Success", "data":data}, status=status.HTTP_200_OK)
     except Exception as e:
-        return Response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+async def get_available_classes_async(request):
+    '''
+    Async version of get_available_classes for ASGI deployments.
+
+    Takes the same query params and returns the same responses, but the 
+    slots are read with the async ORM, so a worker can serve other 
+    requests while it waits for the database. Used instead of 
+    get_available_classes when ASYNC_READ_VIEWS is enabled.
+    '''
+    if request.method != 'GET':
+        return json_response({"detail": f'Method "{request.method}" not allowed.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    user, error_response = await authenticate_async(request, IsUser)
+    if error_response is not None:
+        return error_response
+    try:
+        params = AvailableClassesQuerySerializer(data=request.GET)
+        if not params.is_valid():
+            return json_response({"status":"Error", "data":params.errors}, status=status.HTTP_400_BAD_REQUEST)
+        filters = dict(params.validated_data)
+        # An invalid or missing timezone falls back to the studio timezone.
+        target_timezone = get_timezone(request.GET.get('timezone'))
+
+        cache_key = await available_classes_cache.amake_key(*available_classes_cache_parts(filters, target_timezone))
+        payload = await available_classes_cache.aget(cache_key)
+        if payload is None:
+            available_slots, limit = available_classes_queryset(filters)
+            available_slots = [slot async for slot in available_slots.aiterator()]
+            payload = available_classes_page(available_slots, limit, target_timezone)
+            await available_classes_cache.aset(cache_key, payload)
+            cache_status = 'MISS'
+        else:
+            cache_status = 'HIT'
+
+        response = json_response(payload, status=status.HTTP_200_OK)
+        response['X-Cache'] = cache_status
+        logger.debug('available classes cache=%s', cache_status)
+        return response
+    except Exception as e:
+        return json_response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def available_classes_cache_parts(filters, target_timezone):
+    return target_timezone.key if target_timezone else None, sorted(filters.items())
+
+def available_classes_payload(filters, target_timezone):
+    '''
+    Build one page of the available classes listing.
+    '''
+    available_slots, limit = available_classes_queryset(filters)
+    return available_classes_page(list(available_slots), limit, target_timezone)
+
+def available_classes_queryset(filters):
+    '''
+    Return the slots of one page (plus one extra row) and the page size.
+    '''
+    cursor = filters.pop('cursor', None)
+    limit = filters.pop('limit')
+
+    # Slots that haven't started yet and still have seats left, a range
+    # scan over start_at.
+    available_slots = ClassSlot.objects.available(timezone.now()).filter_listing(**filters)
+    if cursor:
+        available_slots = available_slots.after(*cursor)
+
+    # Fetching one extra row tells whether there is a next page.
+    return available_slots[:limit + 1], limit
+
+def available_classes_page(available_slots, limit, target_timezone):
+    next_cursor = None
+    if len(available_slots) > limit:
+        available_slots = available_slots[:limit]
+        last = available_slots[-1]
+        next_cursor = encode_cursor([last.start_at.isoformat(), last.id])
+
+    with timed('serialize'):
+        data = [slot_representation(slot, target_timezone) for slot in available_slots]
+    logger.debug('available classes page rows=%d has_next=%s', len(data), next_cursor is not None)
+    return {"status":"Success", "data": data, "next_cursor": next_cursor}
@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -48,6 +51,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.ThrottleMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,12 +85,55 @@ WSGI_APPLICATION = 'fitness_studio.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Configured from the environment. DB_ENGINE=postgres is meant for
+# production; the default SQLite file is for local use and tests.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    # DB_POOL_MAX_SIZE enables Django's psycopg connection pool (needs
+    # psycopg[pool]). A pool replaces persistent connections, so
+    # DB_CONN_MAX_AGE only applies without it.
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 0))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'fitness_studio'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if DB_POOL_MAX_SIZE else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                    'max_size': DB_POOL_MAX_SIZE,
+                    'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                },
+            } if DB_POOL_MAX_SIZE else {},
+        }
+    }
+else:
+    # WAL lets readers run alongside the single writer, synchronous=NORMAL
+    # is safe with WAL, and IMMEDIATE transactions wait on the busy timeout
+    # for the write lock instead of failing on lock upgrade.
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'init_command': 'PRAGMA journal_mode=WAL;PRAGMA synchronous=NORMAL',
+                'timeout': int(os.environ.get('DB_BUSY_TIMEOUT', 20)),
+                'transaction_mode': 'IMMEDIATE',
+            },
+            # The in-memory test database locks whole tables instead of
+            # waiting on the busy timeout, which breaks the concurrency tests.
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
+        }
     }
-}
 
 
 # Password validation
@@ -107,6 +155,43 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing profiles with explicit cost parameters. The active
+# profile's hasher hashes new passwords; existing hashes made with another
+# profile are rehashed on the next login. Compare profiles with
+# `python manage.py bench_login`. The argon2 profiles need argon2-cffi.
+
+PASSWORD_HASHER_PROFILES = {
+    'pbkdf2': {'algorithm': 'pbkdf2_sha256', 'iterations': 1_000_000},
+    'pbkdf2-light': {'algorithm': 'pbkdf2_sha256', 'iterations': 260_000},
+    'scrypt': {'algorithm': 'scrypt', 'work_factor': 2**14, 'block_size': 8, 'parallelism': 1},
+    'argon2': {'algorithm': 'argon2', 'time_cost': 2, 'memory_cost': 102400, 'parallelism': 8},
+    'argon2-light': {'algorithm': 'argon2', 'time_cost': 1, 'memory_cost': 32768, 'parallelism': 2},
+}
+
+PASSWORD_HASHER_PROFILE = os.environ.get('PASSWORD_HASHER_PROFILE', 'pbkdf2')
+
+if PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]['algorithm'] == 'argon2':
+    # Fail at startup rather than on the first sign up or login.
+    try:
+        import argon2
+    except ImportError:
+        raise ImproperlyConfigured(
+            f"PASSWORD_HASHER_PROFILE '{PASSWORD_HASHER_PROFILE}' needs argon2-cffi (pip install -r requirements.txt)."
+        )
+
+TUNED_PASSWORD_HASHERS = {
+    'pbkdf2_sha256': 'user.hashers.TunedPBKDF2PasswordHasher',
+    'scrypt': 'user.hashers.TunedScryptPasswordHasher',
+    'argon2': 'user.hashers.TunedArgon2PasswordHasher',
+}
+
+# The active profile's hasher first, the others only verify old hashes.
+PASSWORD_HASHERS = sorted(
+    TUNED_PASSWORD_HASHERS.values(),
+    key=lambda hasher: hasher != TUNED_PASSWORD_HASHERS[PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]['algorithm']],
+)
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -118,6 +203,9 @@ USE_I18N = True
 
 USE_TZ = True
 
+# Timezone the studio's class dates and slot times are entered in.
+STUDIO_TIME_ZONE = os.environ.get('STUDIO_TIME_ZONE', 'Asia/Kolkata')
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
@@ -129,12 +217,108 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Build request.user from the access token claims instead of loading the
+# user from the database on every request (see core.authentication).
+JWT_STATELESS_AUTH = os.environ.get('JWT_STATELESS_AUTH', '').lower() in ('1', 'true', 'yes')
+
+# User rows loaded for token-backed users that need more than the token
+# claims: how many are kept per process, and for how many seconds.
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+USER_CACHE_TIMEOUT = int(os.environ.get('USER_CACHE_TIMEOUT', 60))
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    # Revoked refresh token JTIs (see user.blacklist). Only a cache shared
+    # by every process, warmed with `purge_expired_tokens --warm`, spares
+    # refreshes the blacklist query. It must hold every revoked JTI: an
+    # evicted one would be accepted again.
+    'token_blacklist': (
+        {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': os.environ['TOKEN_BLACKLIST_CACHE_URL']}
+        if os.environ.get('TOKEN_BLACKLIST_CACHE_URL') else
+        {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'token_blacklist'}
+    ),
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'core.authentication.StatelessJWTAuthentication'
+        if JWT_STATELESS_AUTH else
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
 }
 
+# Serve the read-only listing endpoints (available classes and booking
+# details) with async views. Only worth it under an ASGI server.
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', '').lower() in ('1', 'true', 'yes')
+
+# Aggregated request timings are served at core/stats when enabled.
+PROFILING_STATS_ENABLED = DEBUG
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {
+            'format': 'time=%(asctime)s level=%(levelname)s logger=%(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+        },
+    },
+    'loggers': {
+        app: {'handlers': ['console'], 'level': 'INFO'}
+        for app in ('core', 'user', 'fitness_class', 'class_booking')
+    },
+}
+
+# Seconds a cached available classes response may be served. Creating a
+# class or booking a slot invalidates it earlier; the timeout only bounds
+# how long slots that have started since stay listed.
+AVAILABLE_CLASSES_CACHE_TIMEOUT = 30
+
+# Days ahead the slots of recurring class schedules are materialized.
+# Run the materialize_schedules command daily to move the window along.
+SCHEDULE_HORIZON_DAYS = 28
+
+# Rows fetched per query by the streaming exports (see core.streaming).
+EXPORT_CHUNK_SIZE = 2000
+
+# Background tasks (see core.tasks), run by the run_tasks command.
+TASK_BATCH_SIZE = 100
+TASK_MAX_ATTEMPTS = 5
+# Seconds before the first retry of a failed task, doubled per attempt.
+TASK_RETRY_DELAY = 30
+# Seconds a worker may hold a task before another worker takes it over.
+TASK_LEASE_SECONDS = 300
+
+# Delivery of booking confirmations and class reminders (see
+# core.notifications): ConsoleBackend or FileBackend, which appends JSON
+# lines to NOTIFICATION_FILE_PATH.
+NOTIFICATION_BACKEND = os.environ.get('NOTIFICATION_BACKEND', 'core.notifications.ConsoleBackend')
+NOTIFICATION_FILE_PATH = os.environ.get('NOTIFICATION_FILE_PATH', BASE_DIR / 'notifications.log')
+
+# Minutes before a class starts that its members get a reminder.
+REMINDER_MINUTES_BEFORE = 60
+
+# Token bucket rate limits per URL name and client (see core.throttling),
+# as '<requests>/<s|min|hour|day>': bursts up to <requests>, refilled
+# evenly over the period. URL names without a rate are not limited.
+THROTTLE_RATES = {
+    'book_slot': '10/min',
+    'create_user': '5/hour',
+    'token_obtain_pair': '10/min',
+}
+# core.throttling.LocalBuckets keeps the buckets per process,
+# core.throttling.CacheBuckets shares them through the THROTTLE_CACHE cache.
+THROTTLE_BACKEND = os.environ.get('THROTTLE_BACKEND', 'core.throttling.LocalBuckets')
+THROTTLE_CACHE = 'default'
+# Reverse proxies in front of the app; the client IP is then read from
+# X-Forwarded-For instead of the proxy's address.
+THROTTLE_PROXY_COUNT = int(os.environ.get('THROTTLE_PROXY_COUNT', 0))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=1),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=5),
@@ -21,5 +21,6 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('user/', include('user.urls')),
     path('class/', include('fitness_class.urls')),
-    path('booking/', include('class_booking.urls'))
+    path('booking/', include('class_booking.urls')),
+    path('core/', include('core.urls'))
 ]
@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+KEY_PREFIX = 'jwt:revoked:'
+# Written once every unexpired revoked JTI is in the cache (see warm). A
+# cache that lost it was flushed or never warmed and cannot be trusted.
+WARMED_KEY = 'jwt:revoked:warmed'
+
+
+def _cache():
+    # A dedicated 'token_blacklist' cache alias is used when configured.
+    return caches['token_blacklist' if 'token_blacklist' in settings.CACHES else 'default']
+
+
+def _timeout(expires_at):
+    # Revoked JTIs only need to be remembered until the token expires anyway.
+    if isinstance(expires_at, datetime):
+        expires_at = expires_at.timestamp()
+    return max(int(expires_at - datetime.now(timezone.utc).timestamp()) + 1, 1)
+
+
+def revoke(jti, expires_at):
+    '''
+    Add a refresh token JTI to the revoked set until the token expires.
+    '''
+    _cache().set(KEY_PREFIX + jti, True, _timeout(expires_at))
+
+
+def revoke_many(tokens):
+    '''
+    Add many (jti, expires_at) pairs to the revoked set with one
+    set_many, kept until the last of them expires.
+    '''
+    tokens = list(tokens)
+    if tokens:
+        _cache().set_many(
+            {KEY_PREFIX + jti: True for jti, _ in tokens},
+            max(_timeout(expires_at) for _, expires_at in tokens),
+        )
+
+
+def warm(batch_size=5000):
+    '''
+    Load every unexpired blacklisted JTI into the revoked set, then mark
+    the set as complete. Returns the number of JTIs loaded.
+    '''
+    revoked = BlacklistedToken.objects.filter(token__expires_at__gt=datetime.now(timezone.utc)).values_list(
+        'token__jti', 'token__expires_at'
+    )
+    batch = []
+    count = 0
+    for jti, expires_at in revoked.iterator(chunk_size=batch_size):
+        batch.append((jti, expires_at))
+        if len(batch) == batch_size:
+            revoke_many(batch)
+            count += len(batch)
+            batch = []
+    revoke_many(batch)
+    _cache().set(WARMED_KEY, True, None)
+    return count + len(batch)
+
+
+def is_revoked(jti):
+    '''
+    Check a refresh token JTI against the revoked set.
+
+    Once the set is warm it is authoritative: a refresh reads one cache
+    key and never touches the token tables. Without the WARMED_KEY
+    sentinel (a per-process cache, or a shared one that was flushed) a
+    miss falls back to the BlacklistedToken table, indexed on the jti, and
+    a hit is cached again.
+    '''
+    cached = _cache().get_many([KEY_PREFIX + jti, WARMED_KEY])
+    if KEY_PREFIX + jti in cached:
+        return True
+    if WARMED_KEY in cached:
+        return False
+    blacklisted = BlacklistedToken.objects.filter(token__jti=jti).values_list('token__expires_at', flat=True).first()
+    if blacklisted is None:
+        return False
+    revoke(jti, blacklisted)
+    return True
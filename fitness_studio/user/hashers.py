@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+
+
+def profile_cost(algorithm, name, default):
+    '''
+    Cost parameter `name` of the active PASSWORD_HASHER_PROFILE.
+
+    Hashers of other algorithms keep Django's defaults; their hashes are
+    upgraded to the active algorithm on the next login anyway.
+    '''
+    profile = settings.PASSWORD_HASHER_PROFILES[settings.PASSWORD_HASHER_PROFILE]
+    if profile['algorithm'] != algorithm:
+        return default
+    return profile.get(name, default)
+
+
+# Each hasher reads its cost from the active profile, so changing the
+# profile makes must_update() true for existing hashes and Django rehashes
+# the password transparently on the next successful login.
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+
+    @property
+    def iterations(self):
+        return profile_cost(self.algorithm, 'iterations', PBKDF2PasswordHasher.iterations)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+
+    @property
+    def work_factor(self):
+        return profile_cost(self.algorithm, 'work_factor', ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self):
+        return profile_cost(self.algorithm, 'block_size', ScryptPasswordHasher.block_size)
+
+    @property
+    def parallelism(self):
+        return profile_cost(self.algorithm, 'parallelism', ScryptPasswordHasher.parallelism)
+
+    @property
+    def maxmem(self):
+        return profile_cost(self.algorithm, 'maxmem', ScryptPasswordHasher.maxmem)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    '''
+    Requires the argon2-cffi package.
+    '''
+
+    @property
+    def time_cost(self):
+        return profile_cost(self.algorithm, 'time_cost', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return profile_cost(self.algorithm, 'memory_cost', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return profile_cost(self.algorithm, 'parallelism', Argon2PasswordHasher.parallelism)
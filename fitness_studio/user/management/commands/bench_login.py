@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+
+class Command(BaseCommand):
+    help = (
+        'Report how many password checks (the CPU cost of a login) one worker '
+        'can do per second under each PASSWORD_HASHER_PROFILES entry.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', default=','.join(settings.PASSWORD_HASHER_PROFILES),
+            help='Comma separated profile names (default: all).'
+        )
+        parser.add_argument('--seconds', type=float, default=3.0, help='Time spent measuring each profile.')
+
+    def handle(self, *args, **options):
+        for name in options['profiles'].split(','):
+            profile = settings.PASSWORD_HASHER_PROFILES[name]
+            preferred = settings.TUNED_PASSWORD_HASHERS[profile['algorithm']]
+            hashers = [preferred] + [h for h in settings.TUNED_PASSWORD_HASHERS.values() if h != preferred]
+            with override_settings(PASSWORD_HASHER_PROFILE=name, PASSWORD_HASHERS=hashers):
+                try:
+                    encoded = make_password('correct horse battery staple')
+                except ValueError as e:
+                    self.stdout.write(f'{name:<14} skipped: {e}')
+                    continue
+                logins = 0
+                start = time.perf_counter()
+                while time.perf_counter() - start < options['seconds']:
+                    check_password('correct horse battery staple', encoded)
+                    logins += 1
+                elapsed = time.perf_counter() - start
+            costs = ', '.join(f'{key}={value}' for key, value in profile.items() if key != 'algorithm')
+            self.stdout.write(
+                f'{name:<14} {logins / elapsed:>8.1f} logins/s per worker   '
+                f'{elapsed / logins * 1000:>7.1f} ms/login   ({profile["algorithm"]}: {costs})'
+            )
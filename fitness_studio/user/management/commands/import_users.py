@@ -0,0 +1,151 @@
+import csv
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from user.models import CustomUser
+from user.serializers import UserImportSerializer
+
+
+def _init_worker():
+    # Needed when worker processes are spawned rather than forked.
+    django.setup()
+
+
+def read_rows(path, file_format):
+    '''
+    Yield (line_number, row) pairs from a CSV (with a header) or JSONL file.
+    '''
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                yield line_number, row
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    row = e
+                yield line_number, row
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk import users from a CSV or JSONL file with name, email, password and optional role. '
+        'Rows are validated in chunks, passwords are hashed in a process pool and users are '
+        'inserted with bulk_create. Invalid rows are reported and skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with header) or JSONL file.')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Input format (default: from the file extension).')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows validated and inserted together.')
+        parser.add_argument('--workers', type=int, default=None, help='Password hashing processes (default: CPU count).')
+        parser.add_argument('--errors', help='Write per-row errors to this JSONL file instead of stderr.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and hash without inserting.')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or ('jsonl' if options['path'].endswith(('.jsonl', '.ndjson')) else 'csv')
+        errors_file = open(options['errors'], 'w', encoding='utf-8') if options['errors'] else None
+        self.error_out = errors_file or sys.stderr
+        self.seen_emails = set()
+        created = failed = 0
+        start = time.perf_counter()
+
+        try:
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as executor:
+                rows = read_rows(options['path'], file_format)
+                for chunk in chunked(rows, options['chunk_size']):
+                    valid, chunk_failed = self.validate_chunk(chunk)
+                    passwords = [data['password'] for _, data in valid]
+                    hashed = executor.map(make_password, passwords, chunksize=max(len(passwords) // 32, 1))
+                    users = [
+                        (line_number, CustomUser(
+                            name=data['name'], email=data['email'], role=data['role'], password=password,
+                        ))
+                        for (line_number, data), password in zip(valid, hashed)
+                    ]
+                    chunk_created, insert_failed = (len(users), 0) if options['dry_run'] else self.insert(users)
+                    created += chunk_created
+                    failed += chunk_failed + insert_failed
+
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(f'{created} created, {failed} failed, {created / elapsed:.0f} users/s')
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+        finally:
+            if errors_file:
+                errors_file.close()
+
+        elapsed = time.perf_counter() - start
+        verb = 'validated' if options['dry_run'] else 'imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{created} users {verb}, {failed} rows failed in {elapsed:.1f}s ({created / elapsed:.0f} users/s).'
+        ))
+
+    def validate_chunk(self, chunk):
+        valid = []
+        failed = 0
+        for line_number, row in chunk:
+            if not isinstance(row, dict):
+                self.report(line_number, None, f'Invalid row: {row}')
+                failed += 1
+                continue
+            serializer = UserImportSerializer(data=row)
+            if not serializer.is_valid():
+                self.report(line_number, row.get('email'), serializer.errors)
+                failed += 1
+                continue
+            email = serializer.validated_data['email']
+            if email in self.seen_emails:
+                self.report(line_number, email, 'Duplicate email in the import file.')
+                failed += 1
+                continue
+            self.seen_emails.add(email)
+            valid.append((line_number, serializer.validated_data))
+
+        # One query per chunk for emails that already have an account.
+        existing = set(CustomUser.objects.filter(
+            email__in=[data['email'] for _, data in valid]
+        ).values_list('email', flat=True))
+        for line_number, data in valid:
+            if data['email'] in existing:
+                self.report(line_number, data['email'], 'A user with this email already exists.')
+        return [(n, data) for n, data in valid if data['email'] not in existing], failed + len(existing)
+
+    def insert(self, users):
+        try:
+            with transaction.atomic():
+                CustomUser.objects.bulk_create([user for _, user in users])
+            return len(users), 0
+        except IntegrityError:
+            # Another writer took some of the emails meanwhile: insert row by
+            # row so only the conflicting rows fail.
+            created = failed = 0
+            for line_number, user in users:
+                try:
+                    with transaction.atomic():
+                        user.save()
+                    created += 1
+                except IntegrityError as e:
+                    self.report(line_number, user.email, str(e))
+                    failed += 1
+            return created, failed
+
+    def report(self, line_number, email, error):
+        self.error_out.write(json.dumps({'line': line_number, 'email': email, 'error': error}) + '\n')
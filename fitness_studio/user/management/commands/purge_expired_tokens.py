@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from user import blacklist
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired outstanding and blacklisted refresh tokens in small batches. '
+        'Meant to run on a schedule (e.g. daily from cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Tokens deleted per transaction.')
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Also load every unexpired blacklisted JTI into the revoked-token cache and mark it '
+                 'warm, so refreshes stop querying the blacklist table.'
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deleted = 0
+        while True:
+            # Short batches keep each DELETE (and its cascade to
+            # BlacklistedToken) from locking the tables for long.
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lte=now).values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            OutstandingToken.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+        self.stdout.write(self.style.SUCCESS(f'{deleted} expired token(s) purged.'))
+
+        if options['warm']:
+            count = blacklist.warm(options['batch_size'])
+            self.stdout.write(f'{count} revoked token(s) loaded into the cache.')
@@ -1,9 +1,11 @@
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 from rest_framework import serializers
 
 from .models import CustomUser
+from .tokens import StudioRefreshToken
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = StudioRefreshToken
 
     @classmethod
     def get_token(cls, user):
@@ -16,6 +18,9 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         
         return token
     
+class MyTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = StudioRefreshToken
+
 class CustomUserSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -30,4 +35,14 @@ class CustomUserSerializer(serializers.ModelSerializer):
             allowed = set(required_fields)
             existing = set(self.fields)
             for field_name in existing - allowed:
-                self.fields.pop(field_name)
\ No newline at end of file
+                self.fields.pop(field_name)
+
+class UserImportSerializer(serializers.Serializer):
+    '''
+    Validates one row of a bulk user import. Email uniqueness is checked per 
+    chunk by the import_users command instead of one query per row.
+    '''
+    name = serializers.CharField(max_length=100)
+    email = serializers.EmailField(max_length=100)
+    password = serializers.CharField()
+    role = serializers.ChoiceField(choices=CustomUser.UserRole.choices, default=CustomUser.UserRole.USER)
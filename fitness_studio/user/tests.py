@@ -1,3 +1,131 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache.backends.dummy import DummyCache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+
+from core.seed import create_members
+from user.models import CustomUser
+from . import blacklist
+from .management.commands.import_users import Command as ImportUsersCommand
+from .tokens import StudioRefreshToken
+
+
+class BlacklistTests(TestCase):
+
+    def setUp(self):
+        blacklist._cache().clear()
+        self.user = CustomUser.objects.get(id=create_members(1)[0])
+
+    def test_cache_miss_falls_back_to_the_blacklist_table(self):
+        token = StudioRefreshToken.for_user(self.user)
+        token.blacklist()
+        jti = token['jti']
+        blacklist._cache().clear()
+        self.assertTrue(blacklist.is_revoked(jti))
+        # The hit is cached again.
+        self.assertTrue(blacklist._cache().get(blacklist.KEY_PREFIX + jti))
+
+    def test_backend_that_loses_every_key_still_revokes(self):
+        token = StudioRefreshToken.for_user(self.user)
+        token.blacklist()
+        with mock.patch.object(blacklist, '_cache', return_value=DummyCache('dummy', {})):
+            self.assertTrue(blacklist.is_revoked(token['jti']))
+            self.assertFalse(blacklist.is_revoked(StudioRefreshToken.for_user(self.user)['jti']))
+
+    def test_revoke_many_sets_every_key_at_once(self):
+        tokens = [StudioRefreshToken.for_user(self.user) for _ in range(3)]
+        cache = blacklist._cache()
+        with mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            blacklist.revoke_many((token['jti'], token['exp']) for token in tokens)
+        set_many.assert_called_once()
+        for token in tokens:
+            self.assertTrue(blacklist.is_revoked(token['jti']))
+
+    def test_live_token_check_runs_no_queries_once_warm(self):
+        token = str(StudioRefreshToken.for_user(self.user))
+        blacklist.warm()
+        with self.assertNumQueries(0):
+            StudioRefreshToken(token)
+
+    def test_revoked_token_is_rejected_without_queries_once_warm(self):
+        token = StudioRefreshToken.for_user(self.user)
+        token.blacklist()
+        blacklist._cache().clear()
+        blacklist.warm()
+        with self.assertNumQueries(0), self.assertRaises(TokenError):
+            StudioRefreshToken(str(token))
+
+    def test_refresh_only_loads_the_user_once_warm(self):
+        token = str(StudioRefreshToken.for_user(self.user))
+        blacklist.warm()
+        with self.assertNumQueries(1):
+            response = APIClient().post('/user/token/refresh', {'refresh': token}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_flushed_cache_falls_back_to_the_table(self):
+        token = StudioRefreshToken.for_user(self.user)
+        blacklist.warm()
+        token.blacklist()
+        blacklist._cache().clear()
+        with self.assertRaises(TokenError):
+            StudioRefreshToken(str(token))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportUsersTests(TestCase):
+
+    def import_rows(self, rows):
+        # Returns the reported errors by line number.
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'users.jsonl')
+        errors_path = os.path.join(directory, 'errors.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(row) + '\n' for row in rows)
+        call_command('import_users', path, '--errors', errors_path, '--workers', '1', stdout=StringIO())
+        with open(errors_path, encoding='utf-8') as f:
+            return {error['line']: error for error in map(json.loads, f)}
+
+    def row(self, number, **fields):
+        return {'name': f'Member {number}', 'email': f'import{number}@example.com', 'password': 'secret', **fields}
+
+    def test_duplicate_email_in_the_file_is_reported(self):
+        errors = self.import_rows([self.row(1), self.row(2), self.row(1, name='Again')])
+        self.assertEqual(list(errors), [3])
+        self.assertEqual(errors[3]['error'], 'Duplicate email in the import file.')
+        self.assertEqual(CustomUser.objects.filter(email__startswith='import').count(), 2)
+
+    def test_existing_email_is_reported(self):
+        CustomUser.objects.create(name='Existing', email='import1@example.com')
+        errors = self.import_rows([self.row(1), self.row(2)])
+        self.assertEqual(list(errors), [1])
+        self.assertEqual(errors[1]['error'], 'A user with this email already exists.')
+        self.assertEqual(CustomUser.objects.get(email='import1@example.com').name, 'Existing')
+        self.assertTrue(CustomUser.objects.filter(email='import2@example.com').exists())
+
+    def test_invalid_row_does_not_abort_its_chunk(self):
+        errors = self.import_rows([self.row(1), self.row(2, email='not an email'), self.row(3, role='admin'), self.row(4)])
+        self.assertEqual(sorted(errors), [2, 3])
+        self.assertEqual(
+            sorted(CustomUser.objects.filter(email__startswith='import').values_list('email', flat=True)),
+            ['import1@example.com', 'import4@example.com'],
+        )
+
+    def test_insert_conflict_only_fails_its_row(self):
+        # An email taken by another writer after the chunk was validated.
+        CustomUser.objects.create(name='Existing', email='import1@example.com')
+        command = ImportUsersCommand()
+        command.error_out = StringIO()
+        users = [
+            (2, CustomUser(name='Member 1', email='import1@example.com')),
+            (3, CustomUser(name='Member 2', email='import2@example.com')),
+        ]
+        self.assertEqual(command.insert(users), (1, 1))
+        self.assertEqual(json.loads(command.error_out.getvalue())['line'], 2)
+        self.assertTrue(CustomUser.objects.filter(email='import2@example.com').exists())
@@ -0,0 +1,24 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import blacklist
+
+
+class StudioRefreshToken(RefreshToken):
+    '''
+    Refresh token checked against the cached revoked-JTI set (user.blacklist).
+    Once the set is warmed, checking a live token reads the cache only;
+    before that a miss still queries BlacklistedToken.
+    '''
+
+    def check_blacklist(self):
+        if blacklist.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        # The BlacklistedToken row stays the durable record.
+        blacklisted = super().blacklist()
+        blacklist.revoke(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+        return blacklisted
@@ -1,11 +1,11 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenRefreshView
 
 from . import views
 
 urlpatterns = [
     path('signup', views.create_account, name='create_user'),
     path('login', views.MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh', TokenRefreshView.as_view(), name='token_refresh'),
-    path('logout', views.logout, name='user_logout'),    
+    path('token/refresh', views.MyTokenRefreshView.as_view(), name='token_refresh'),
+    path('logout', views.logout, name='user_logout'),
+    path('logout_all', views.logout_all, name='user_logout_all'),
 ]
\ No newline at end of file
@@ -1,12 +1,16 @@
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
+from django.db import transaction
+from django.utils import timezone
 
 from .models import CustomUser
-from .serializers import MyTokenObtainPairSerializer, CustomUserSerializer
+from .serializers import MyTokenObtainPairSerializer, MyTokenRefreshSerializer, CustomUserSerializer
+from .tokens import StudioRefreshToken
+from . import blacklist
 
 # Create your views here.
 class MyTokenObtainPairView(TokenObtainPairView):
@@ -28,6 +32,26 @@ class MyTokenObtainPairView(TokenObtainPairView):
     '''
     serializer_class = MyTokenObtainPairSerializer
 
+class MyTokenRefreshView(TokenRefreshView):
+    '''
+    Create a new access token from a refresh token.
+
+    Revoked refresh tokens are looked up in the cached blacklist. Once it 
+    is warmed (purge_expired_tokens --warm) a refresh only loads the user.
+
+    HTTP Method:
+        POST
+
+    Request Data:
+        - refresh (str): The refresh token of the signed in user.
+
+    Responses:
+        - Success: Returns the new access token.
+        - Error: If the refresh token is invalid, expired or blacklisted, 
+          returns with a detailed error message.
+    '''
+    serializer_class = MyTokenRefreshSerializer
+
 @api_view(['POST'])
 def create_account(request):
     '''
@@ -85,8 +109,44 @@ def logout(request):
     '''
     try:
         refresh_token = request.data["refresh_token"]
-        token = RefreshToken(refresh_token)
+        token = StudioRefreshToken(refresh_token)
         token.blacklist()
         return Response({"status":"Success", "message":"User is logged out"}, status=status.HTTP_200_OK)
     except Exception as e:
-        return Response({"status":"Error", "data":str(e)}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response({"status":"Error", "data":str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout_all(request):
+    '''
+    Log out the user from every device by blacklisting all of their 
+    unexpired refresh tokens at once.
+
+    The user must include their access token in the request 
+    headers to authenticate the request.
+
+    HTTP Method:
+        POST
+
+    Responses:
+        - Success: Returns a status of "Success" and a message with the number 
+          of refresh tokens revoked.
+        - Exception: In case of an unexpected error, returns a status of "Error" 
+          with the exception message.
+    '''
+    try:
+        tokens = list(OutstandingToken.objects.filter(
+            user_id=request.user.id,
+            expires_at__gt=timezone.now(),
+            blacklistedtoken__isnull=True,
+        ).values_list('id', 'jti', 'expires_at'))
+        with transaction.atomic():
+            BlacklistedToken.objects.bulk_create(
+                [BlacklistedToken(token_id=token_id) for token_id, _, _ in tokens],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+        blacklist.revoke_many((jti, expires_at) for _, jti, expires_at in tokens)
+        return Response({"status":"Success", "message":f"{len(tokens)} sessions logged out"}, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({"status":"Error", "data":str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file